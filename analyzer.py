@@ -0,0 +1,215 @@
+import math
+import re
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import pymupdf
+
+from job_model import render_job_model
+
+# Core analysis logic shared by the Streamlit app and the batch CLI.
+# Nothing in here touches Streamlit, so it is safe to import from worker
+# processes and background threads. Model calls go through an LLMBackend
+# (see llm_backends.py).
+
+# Enhanced PROMPT with extremely detailed analysis structure
+PROMPT = """
+Analyze the following resume against the job description and provide an extremely comprehensive and actionable analysis:
+
+1. **MATCH PERCENTAGE**: 
+   - Start with a clear percentage score (e.g., "75%") 
+   - Break down how you calculated this score (skills matches, experience alignment, education fit, etc.)
+   - Explain what the percentage means in terms of overall fit for this position
+   - Note if certain critical requirements heavily affected the score
+
+2. **KEY STRENGTHS**: 
+   - List all specific skills, experiences, and qualifications that directly align with job requirements
+   - Highlight the most impressive achievements that match employer priorities
+   - Quantify the strength of alignment for each match (strong, moderate, weak)
+   - Note any unique selling points that set the candidate apart from typical applicants
+   - Identify any particularly valuable experiences that deserve emphasis
+
+3. **MISSING QUALIFICATIONS**: 
+   - List all important requirements from the job description not found in the resume
+   - Categorize missing requirements by importance (critical, important, nice-to-have)
+   - Identify any critical certifications, degrees, or technical skills that are missing
+   - Explain the exact impact of these gaps on the candidate's application
+   - Suggest specific ways to address or compensate for each missing qualification
+
+4. **SKILL GAPS**: 
+   - Detail all technical skills mentioned in the job description but not in the resume
+   - Identify soft skills emphasized in the job posting but not demonstrated
+   - Compare years of experience required vs. shown on resume for key areas
+   - Suggest specific courses, certifications, or projects to address each gap
+   - Provide language to use that can minimize the impact of these gaps
+
+5. **ATS OPTIMIZATION**: 
+   - List all specific keywords from the job description missing from the resume
+   - Identify formatting issues that could prevent ATS from properly reading the resume
+   - Suggest reorganization of sections to prioritize most relevant information
+   - Recommend better keyword placement strategies throughout the document
+   - Advise on optimal keyword density without keyword stuffing
+   - Suggest improvements for section headers to better match industry standards
+   - Identify any inconsistencies or errors that might trigger ATS rejection
+
+6. **DETAILED RECOMMENDATIONS**: 
+   - Provide section-by-section suggestions for improvement (Summary, Experience, Skills, etc.)
+   - Suggest specific bullet point rewrites to better align with job requirements
+   - Recommend content to remove that doesn't support this specific application
+   - Suggest precise wording changes to better match job description terminology
+   - Recommend additional sections that could strengthen the application
+   - Provide 3-5 specific, actionable next steps in priority order
+
+Format your response with clear section headers and bullet points. Make all feedback extremely specific, actionable, and prioritized. Leave no ambiguity or unanswered questions in your analysis. Focus on providing concrete suggestions that will directly improve the candidate's chances of getting an interview.
+"""
+
+# System role shared by every analysis request
+SYSTEM_PROMPT = "You are an expert ATS (Applicant Tracking System) analyzer and senior career counselor with 15+ years of experience in recruitment and HR. Provide extremely detailed, specific, and actionable feedback on resume-job fit. Always start your response with a clear match percentage and be comprehensive in your recommendations, leaving no questions unanswered."
+
+# Short score-only prompt used for self-consistency sampling
+SCORE_PROMPT = """
+Rate how well the resume below matches the job description, considering skills, experience, education and keyword coverage.
+Reply with ONLY the overall match percentage as a whole number followed by "%" (for example "72%"). Do not add any explanation.
+"""
+
+# Score samples need some diversity to be worth aggregating
+SCORE_TEMPERATURE = 0.7
+
+# Extract text from raw PDF bytes
+def pdf_to_text(data):
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        text = ""
+        for page in doc:
+            text += page.get_text("text")
+    return text.strip()
+
+# Extract text from a PDF on disk (used by process pool workers)
+def pdf_path_to_text(path):
+    with open(path, "rb") as f:
+        return pdf_to_text(f.read())
+
+# Job section of a score-only prompt: the compiled requirements model when
+# there is one, which is much shorter than the raw posting. Heuristic compiles
+# miss too much of non-technical postings to stand in for the original text.
+def job_prompt_section(job_desc, job_model=None):
+    if job_model is not None and job_model["compiled_by"] != "heuristic":
+        return f"**JOB REQUIREMENTS (compiled from the job description):**\n{render_job_model(job_model)}"
+    return f"**JOB DESCRIPTION:**\n{job_desc}"
+
+# Run the full resume vs job description analysis, raising on API errors.
+# Returns the report and the token usage reported by the API. The report quotes
+# the posting's own wording, so it always gets the raw job description.
+def request_analysis_with_usage(backend, resume_text, job_desc):
+    prompt = f"{PROMPT}\n\n**RESUME CONTENT:**\n{resume_text}\n\n**JOB DESCRIPTION:**\n{job_desc}"
+
+    completion = backend.complete(
+        messages=[
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        temperature=0.1,  # Lower temperature for more consistent results
+        max_tokens=4000   # Increased for detailed analysis
+    )
+    return completion.text, completion.usage
+
+# Pull the overall match percentage out of an analysis report
+def extract_match_percentage(text):
+    # Enhanced patterns to catch percentage with explanation
+    patterns = [
+        r'(\d{1,3})%',
+        r'match.*?(\d{1,3})%',
+        r'score.*?(\d{1,3})%',
+        r'percentage.*?(\d{1,3})%',
+        r'rating.*?(\d{1,3})%'
+    ]
+    
+    # Look for the first percentage that makes sense
+    for pattern in patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            for match in matches:
+                percentage = int(match)
+                if 0 <= percentage <= 100:
+                    return percentage
+    return None
+
+# Ask for just the match percentage (a few tokens instead of a full report)
+def request_match_score(backend, resume_text, job_desc, job_model=None):
+    prompt = f"{SCORE_PROMPT}\n\n**RESUME CONTENT:**\n{resume_text}\n\n{job_prompt_section(job_desc, job_model)}"
+
+    completion = backend.complete(
+        messages=[{"role": "user", "content": prompt}],
+        temperature=SCORE_TEMPERATURE,
+        max_tokens=10
+    )
+    return extract_match_percentage(completion.text)
+
+# Normal approximation of the standard error of the median
+MEDIAN_SE_FACTOR = 1.2533
+
+# Half-width of the 95% confidence interval of the median
+def _ci_margin(scores):
+    if len(scores) < 2:
+        return 0.0
+    return 1.96 * MEDIAN_SE_FACTOR * statistics.stdev(scores) / math.sqrt(len(scores))
+
+# Self-consistency scoring: min_samples score-only requests run concurrently
+# and are aggregated by median. Sampling stops once the 95% confidence
+# interval of the median is within +/- tolerance points. Until then the next
+# wave asks for as many samples as the current spread suggests are needed, up
+# to ``samples`` requests in total. Every request holds ``limiter`` (e.g. a
+# semaphore shared with the narrative requests) while it runs, so callers can
+# cap concurrent LLM calls.
+def consistent_match_score(backend, resume_text, job_desc, samples=5, min_samples=3, tolerance=5,
+                           job_model=None, limiter=None):
+    limiter = limiter or nullcontext()
+
+    def sample():
+        with limiter:
+            return request_match_score(backend, resume_text, job_desc, job_model)
+
+    scores = []
+    requested = 0
+    settled = False
+    wave = min(min_samples, samples)
+    with ThreadPoolExecutor(max_workers=max(1, samples), thread_name_prefix="score") as pool:
+        while wave > 0:
+            requested += wave
+            for future in [pool.submit(sample) for _ in range(wave)]:
+                try:
+                    score = future.result()
+                except Exception:
+                    continue  # a failed sample just doesn't count
+                if score is not None:
+                    scores.append(score)
+            if len(scores) >= min_samples and _ci_margin(scores) <= tolerance:
+                settled = True
+                break
+            if len(scores) >= 2 and tolerance > 0:
+                # Samples needed for the interval to shrink to the tolerance
+                spread = 1.96 * MEDIAN_SE_FACTOR * statistics.stdev(scores) / tolerance
+                needed = math.ceil(spread ** 2)
+            else:
+                needed = min_samples
+            wave = min(samples - requested, max(1, needed - len(scores)))
+    stopped_early = settled and requested < samples
+
+    if not scores:
+        return None
+
+    median = statistics.median(scores)
+    margin = _ci_margin(scores)
+    return {
+        "score": int(round(median)),
+        "ci_low": max(0, int(math.floor(median - margin))),
+        "ci_high": min(100, int(math.ceil(median + margin))),
+        "samples": scores,
+        "stopped_early": stopped_early,
+    }
@@ -1,141 +1,174 @@
 import streamlit as st
-from openai import OpenAI
-import pymupdf
 import os
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 from dotenv import load_dotenv
-import re
 from datetime import datetime
 
-# Load environment variables
+# Load environment variables before the app modules are imported
 load_dotenv()
 
+from analyzer import pdf_to_text, request_analysis_with_usage, extract_match_percentage, consistent_match_score
+from llm_backends import create_backend
+from job_model import compile_job_description, local_score
+from result_store import ResultStore, build_record
+from prefetch import SpeculativeRunner
+
+# Settings come from Streamlit secrets first, then environment variables
+def config_value(key, default=None):
+    return st.secrets.get(key, os.getenv(key, default))
+
+# On/off settings; TOML booleans and "1"/"true"/"yes" strings both work
+def config_flag(key, default=False):
+    return str(config_value(key, default)).lower() in ("1", "true", "yes")
+
+# LLM backend: openrouter (default), llamacpp-server, llamacpp or stub
+LLM_BACKEND = config_value("LLM_BACKEND", "openrouter").lower()
+
 # OpenRouter API Configuration
-OPENROUTER_API_KEY = st.secrets.get("OPENROUTER_API_KEY", os.getenv("OPENROUTER_API_KEY"))
-SITE_URL = st.secrets.get("SITE_URL", os.getenv("SITE_URL", "https://resume-analyzer-safagoek.streamlit.app"))
-SITE_NAME = st.secrets.get("SITE_NAME", os.getenv("SITE_NAME", "ATS Resume Analyzer - safagoek"))
+OPENROUTER_API_KEY = config_value("OPENROUTER_API_KEY")
+SITE_URL = config_value("SITE_URL", "https://resume-analyzer-safagoek.streamlit.app")
+SITE_NAME = config_value("SITE_NAME", "ATS Resume Analyzer - safagoek")
+
+# Speculative prefetch: start extraction/analysis before the button is clicked (opt-in)
+SPECULATIVE_PREFETCH = config_flag("SPECULATIVE_PREFETCH")
+SPECULATIVE_DEBOUNCE_SECONDS = float(config_value("SPECULATIVE_DEBOUNCE_SECONDS", "2.0"))
 
-if not OPENROUTER_API_KEY:
+# Consistent scoring: median of several short score-only requests (opt-in)
+CONSISTENT_SCORING = config_flag("CONSISTENT_SCORING")
+SCORE_SAMPLES = int(config_value("SCORE_SAMPLES", "5"))
+SCORE_TOLERANCE = int(config_value("SCORE_TOLERANCE", "5"))
+
+# Job description compilation: cached requirements model for score samples and the local score (opt-in)
+COMPILE_JOB_DESCRIPTIONS = config_flag("COMPILE_JOB_DESCRIPTIONS")
+
+# Result store: scores, timings, token usage and skill lists for the analytics page (no resume text)
+STORE_RESULTS = config_flag("STORE_RESULTS", True)
+
+if LLM_BACKEND == "openrouter" and not OPENROUTER_API_KEY:
     st.error("🔑 API key Not found pls chek streamlid settings.")
     st.stop()
 
-# Configure OpenAI client for OpenRouter
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=OPENROUTER_API_KEY,
-)
-
-# Enhanced PROMPT with extremely detailed analysis structure
-PROMPT = """
-Analyze the following resume against the job description and provide an extremely comprehensive and actionable analysis:
-
-1. **MATCH PERCENTAGE**: 
-   - Start with a clear percentage score (e.g., "75%") 
-   - Break down how you calculated this score (skills matches, experience alignment, education fit, etc.)
-   - Explain what the percentage means in terms of overall fit for this position
-   - Note if certain critical requirements heavily affected the score
-
-2. **KEY STRENGTHS**: 
-   - List all specific skills, experiences, and qualifications that directly align with job requirements
-   - Highlight the most impressive achievements that match employer priorities
-   - Quantify the strength of alignment for each match (strong, moderate, weak)
-   - Note any unique selling points that set the candidate apart from typical applicants
-   - Identify any particularly valuable experiences that deserve emphasis
-
-3. **MISSING QUALIFICATIONS**: 
-   - List all important requirements from the job description not found in the resume
-   - Categorize missing requirements by importance (critical, important, nice-to-have)
-   - Identify any critical certifications, degrees, or technical skills that are missing
-   - Explain the exact impact of these gaps on the candidate's application
-   - Suggest specific ways to address or compensate for each missing qualification
-
-4. **SKILL GAPS**: 
-   - Detail all technical skills mentioned in the job description but not in the resume
-   - Identify soft skills emphasized in the job posting but not demonstrated
-   - Compare years of experience required vs. shown on resume for key areas
-   - Suggest specific courses, certifications, or projects to address each gap
-   - Provide language to use that can minimize the impact of these gaps
-
-5. **ATS OPTIMIZATION**: 
-   - List all specific keywords from the job description missing from the resume
-   - Identify formatting issues that could prevent ATS from properly reading the resume
-   - Suggest reorganization of sections to prioritize most relevant information
-   - Recommend better keyword placement strategies throughout the document
-   - Advise on optimal keyword density without keyword stuffing
-   - Suggest improvements for section headers to better match industry standards
-   - Identify any inconsistencies or errors that might trigger ATS rejection
-
-6. **DETAILED RECOMMENDATIONS**: 
-   - Provide section-by-section suggestions for improvement (Summary, Experience, Skills, etc.)
-   - Suggest specific bullet point rewrites to better align with job requirements
-   - Recommend content to remove that doesn't support this specific application
-   - Suggest precise wording changes to better match job description terminology
-   - Recommend additional sections that could strengthen the application
-   - Provide 3-5 specific, actionable next steps in priority order
-
-Format your response with clear section headers and bullet points. Make all feedback extremely specific, actionable, and prioritized. Leave no ambiguity or unanswered questions in your analysis. Focus on providing concrete suggestions that will directly improve the candidate's chances of getting an interview.
-"""
+# One backend per process, shared by all sessions so its statistics cover every request
+@st.cache_resource
+def get_backend():
+    def setting(key, default=None):
+        defaults = {"SITE_URL": SITE_URL, "SITE_NAME": SITE_NAME}
+        return config_value(key, defaults.get(key, default))
+    return create_backend(LLM_BACKEND, setting)
+
+try:
+    backend = get_backend()
+except Exception as e:
+    st.error(f"❌ LLM backend '{LLM_BACKEND}' could not be started: {str(e)}")
+    st.stop()
 
 # Function to extract text from PDF
 def extract_text_from_pdf(pdf_file):
     try:
         pdf_file.seek(0)  # Reset file pointer
-        with pymupdf.open(stream=pdf_file.read(), filetype="pdf") as doc:
-            text = ""
-            for page in doc:
-                text += page.get_text("text")
-        return text.strip()
+        return pdf_to_text(pdf_file.read())
     except Exception as e:
         st.error(f"❌ PDF okuma hatası: {str(e)}")
         return None
 
-# Function to analyze resume against job description
+# Compiled requirements model for a job description (cached per posting)
+def get_job_model(job_desc):
+    if not COMPILE_JOB_DESCRIPTIONS:
+        return None
+    return compile_job_description(job_desc, backend, config_value("JOB_MODEL_CACHE_DIR"))
+
+# Function to analyze resume against job description, returns (analysis, token usage)
 def analyze_resume(resume_text, job_desc):
     try:
-        prompt = f"{PROMPT}\n\n**RESUME CONTENT:**\n{resume_text}\n\n**JOB DESCRIPTION:**\n{job_desc}"
-        
-        completion = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": SITE_URL,
-                "X-Title": SITE_NAME,
-            },
-            model="deepseek/deepseek-chat-v3-0324:free",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert ATS (Applicant Tracking System) analyzer and senior career counselor with 15+ years of experience in recruitment and HR. Provide extremely detailed, specific, and actionable feedback on resume-job fit. Always start your response with a clear match percentage and be comprehensive in your recommendations, leaving no questions unanswered."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.1,  # Lower temperature for more consistent results
-            max_tokens=4000   # Increased for detailed analysis
-        )
-        return completion.choices[0].message.content
+        return request_analysis_with_usage(backend, resume_text, job_desc)
     except Exception as e:
         st.error(f"❌ AI Analiz hatası: {str(e)}")
-        return None
+        return None, None
+
+# Background workers for speculative prefetch, shared by all sessions
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="prefetch")
+
+# Workers for work a user is actively waiting on, kept apart from speculation
+# so a click never queues behind other sessions' speculative requests
+@st.cache_resource
+def get_analysis_executor():
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="analysis")
+
+# Use the speculative extraction if there is one, otherwise extract now
+def resolve_resume_text(speculation, pdf_file):
+    if speculation is not None:
+        # Still queued behind other work: cancel it and extract right here
+        speculation.extraction.cancel()
+        try:
+            return speculation.extraction.result()
+        except CancelledError:
+            pass
+        except Exception as e:
+            st.error(f"❌ PDF okuma hatası: {str(e)}")
+            return None
+    return extract_text_from_pdf(pdf_file)
+
+# Use the speculative analysis if there is one, otherwise analyze now
+def resolve_analysis(speculation, resume_text, job_desc):
+    runner = st.session_state.speculative_runner
+    if speculation is not None and speculation.analysis is not None and not runner.claim(speculation):
+        try:
+            result = speculation.analysis.result()
+            if result is not None:
+                return result
+        except CancelledError:
+            pass
+        except Exception:
+            # The speculative request may have failed long before the click,
+            # so retry it now rather than reporting a stale error
+            runner.discard_analysis()
+    return analyze_resume(resume_text, job_desc)
+
+# Score-only sampling runs in the background while the full report is generated
+def start_consistent_scoring(resume_text, job_desc):
+    def score():
+        return consistent_match_score(
+            backend, resume_text, job_desc,
+            samples=SCORE_SAMPLES, min_samples=min(3, SCORE_SAMPLES), tolerance=SCORE_TOLERANCE,
+            job_model=get_job_model(job_desc)
+        )
+    return get_analysis_executor().submit(score)
+
+# Compile the posting alongside the report so the first analysis never waits for it
+def start_job_compile(job_desc):
+    if COMPILE_JOB_DESCRIPTIONS:
+        get_analysis_executor().submit(get_job_model, job_desc)
+
+# Shared result store for the analytics page
+@st.cache_resource
+def get_result_store():
+    return ResultStore(config_value("RESULT_STORE_DIR"))
+
+# Record a finished analysis; storage problems never break the analysis itself
+def store_result(resume_text, job_desc, match_percentage, confidence, timings, usage):
+    if not STORE_RESULTS:
+        return
+    try:
+        job_model = get_job_model(job_desc)
+        get_result_store().append([build_record(
+            "app", backend.label, job_desc=job_desc, job_model=job_model, resume_text=resume_text,
+            match_percentage=match_percentage, confidence=confidence,
+            local_check=local_score(resume_text, job_model) if job_model else None,
+            timings=timings, usage=usage,
+        )])
+    except Exception as e:
+        st.caption(f"⚠️ Could not save analysis statistics: {str(e)}")
 
-def extract_match_percentage(text):
-    # Enhanced patterns to catch percentage with explanation
-    patterns = [
-        r'(\d{1,3})%',
-        r'match.*?(\d{1,3})%',
-        r'score.*?(\d{1,3})%',
-        r'percentage.*?(\d{1,3})%',
-        r'rating.*?(\d{1,3})%'
-    ]
-    
-    # Look for the first percentage that makes sense
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            for match in matches:
-                percentage = int(match)
-                if 0 <= percentage <= 100:
-                    return percentage
-    return None
+# One-line summary of a consistent score for the UI and the report
+def describe_score_confidence(confidence):
+    if not confidence:
+        return None
+    samples = len(confidence["samples"])
+    early = ", stopped early" if confidence["stopped_early"] else ""
+    return f"Median of {samples} samples{early} | 95% CI: {confidence['ci_low']}–{confidence['ci_high']}%"
 
 # Streamlit Page Configuration
 st.set_page_config(
@@ -160,6 +193,15 @@ if 'job_description' not in st.session_state:
     st.session_state.job_description = None
 if 'match_percentage' not in st.session_state:
     st.session_state.match_percentage = None
+if 'match_confidence' not in st.session_state:
+    st.session_state.match_confidence = None
+if 'speculative_runner' not in st.session_state:
+    st.session_state.speculative_runner = SpeculativeRunner(
+        get_prefetch_executor(),
+        pdf_to_text,
+        lambda resume_text, job_desc: request_analysis_with_usage(backend, resume_text, job_desc),
+        debounce_s=SPECULATIVE_DEBOUNCE_SECONDS,
+    )
 
 # Custom CSS for dark theme
 st.markdown("""
@@ -371,7 +413,7 @@ status_color = "#4CAF50" if st.session_state.api_connection_tested else "#FFA500
 st.markdown(f"""
 <div class="api-status">
     <span class="status-dot" style="background: {status_color};"></span>
-    API: {api_status}
+    API ({backend.name}): {api_status}
 </div>
 """, unsafe_allow_html=True)
 
@@ -380,17 +422,23 @@ col_api, col_spacer = st.columns([1, 10])
 with col_api:
     if st.button("Test API", key="api_test"):
         try:
-            test_completion = client.chat.completions.create(
-                model="deepseek/deepseek-chat-v3-0324:free",
-                messages=[{"role": "user", "content": "Test"}],
-                max_tokens=10
-            )
+            backend.ping()
             st.session_state.api_connection_tested = True
             st.success("✅ API Connection Successful!")
             st.rerun()  # Refresh to update the status indicator
         except Exception as e:
             st.error(f"❌ API Connection Failed: {str(e)}")
 
+# Backend latency and throughput since the app started
+with st.expander(f"📡 Backend performance ({backend.label})"):
+    backend_stats = backend.stats.snapshot()
+    stat_cols = st.columns(5)
+    stat_cols[0].metric("Requests", f"{backend_stats['requests']} ({backend_stats['failures']} failed)")
+    stat_cols[1].metric("Latency p50", f"{backend_stats['latency_p50_s']:.2f}s" if backend_stats["latency_p50_s"] is not None else "–")
+    stat_cols[2].metric("Latency p95", f"{backend_stats['latency_p95_s']:.2f}s" if backend_stats["latency_p95_s"] is not None else "–")
+    stat_cols[3].metric("Throughput", f"{backend_stats['tokens_per_s']:.1f} tok/s" if backend_stats["tokens_per_s"] is not None else "–")
+    stat_cols[4].metric("Requests/min", f"{backend_stats['requests_per_min']:.2f}" if backend_stats["requests_per_min"] is not None else "–")
+
 # How to use section - At the top
 st.markdown("""
 ### 🔍 How to Use This Tool
@@ -486,6 +534,39 @@ with col2:
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+# Speculative prefetch - start work while the user is still reading the inputs
+speculative_mode = st.toggle(
+    "⚡ Speculative prefetch",
+    value=SPECULATIVE_PREFETCH,
+    key="speculative_mode",
+    help="Extract the PDF on upload and start the AI analysis in the background once both inputs stop changing."
+)
+speculative_runner = st.session_state.speculative_runner
+speculation = None
+
+if not speculative_mode:
+    speculative_runner.cancel()
+elif uploaded_file:
+    pdf_bytes = uploaded_file.getvalue()
+    if job_description.strip() and len(job_description.split()) >= 20:
+        speculation = speculative_runner.speculate(pdf_bytes, job_description)
+        if speculation.status == "ready":
+            st.caption("⚡ Analysis prepared in the background, results are ready.")
+        else:
+            st.caption("⚡ Analysis is being prepared in the background...")
+    else:
+        speculative_runner.upload(pdf_bytes)
+        speculative_runner.discard_analysis()
+else:
+    speculative_runner.cancel()
+
+consistent_scoring = st.toggle(
+    "🎯 Consistent scoring",
+    value=CONSISTENT_SCORING,
+    key="consistent_scoring",
+    help="Sample several short score-only requests in parallel and report their median with a confidence interval."
+)
+
 # Analysis Button - Centered
 st.markdown("<div style='display: flex; justify-content: center; margin: 2rem 0;'>", unsafe_allow_html=True)
 analyze_button = st.button("🚀 Start Professional Analysis", type="primary", key="analyze_btn", use_container_width=False)
@@ -510,7 +591,12 @@ if analyze_button:
         status_text.markdown("📄 **Step 1/4:** Extracting text from PDF...")
         progress_bar.progress(10)
         
-        resume_text = extract_text_from_pdf(uploaded_file)
+        started_at = time.perf_counter()
+        if speculation is not None:
+            # The user is waiting now, skip whatever is left of the debounce
+            speculation = speculative_runner.speculate(uploaded_file.getvalue(), job_description, immediate=True)
+        resume_text = resolve_resume_text(speculation, uploaded_file)
+        extraction_s = time.perf_counter() - started_at
         progress_bar.progress(25)
         
         if resume_text and len(resume_text.strip()) > 100:
@@ -525,7 +611,11 @@ if analyze_button:
             status_text.markdown("🧠 **Step 3/4:** AI analyzing resume vs job requirements...")
             progress_bar.progress(50)
             
-            analysis = analyze_resume(resume_text, job_description)
+            start_job_compile(job_description)
+            score_future = start_consistent_scoring(resume_text, job_description) if consistent_scoring else None
+            analysis_started_at = time.perf_counter()
+            analysis, usage = resolve_analysis(speculation, resume_text, job_description)
+            analysis_s = time.perf_counter() - analysis_started_at
             progress_bar.progress(80)
             
             if analysis:
@@ -533,8 +623,17 @@ if analyze_button:
                 status_text.markdown("📊 **Step 4/4:** Processing results...")
                 progress_bar.progress(95)
                 
-                # Extract match percentage
-                match_percentage = extract_match_percentage(analysis)
+                # Extract match percentage, preferring the consistent score
+                match_confidence = None
+                if score_future is not None:
+                    try:
+                        match_confidence = score_future.result()
+                    except Exception as e:
+                        st.warning(f"⚠️ Consistent scoring failed, using the report's score: {str(e)}")
+                if match_confidence:
+                    match_percentage = match_confidence["score"]
+                else:
+                    match_percentage = extract_match_percentage(analysis)
                 progress_bar.progress(100)
                 
                 # Store data in session state to prevent page refresh issues
@@ -542,6 +641,13 @@ if analyze_button:
                 st.session_state.resume_text = resume_text
                 st.session_state.job_description = job_description
                 st.session_state.match_percentage = match_percentage
+                st.session_state.match_confidence = match_confidence
+                
+                store_result(resume_text, job_description, match_percentage, match_confidence, {
+                    "extraction_s": extraction_s,
+                    "analysis_s": analysis_s,
+                    "total_s": time.perf_counter() - started_at,
+                }, usage)
                 
                 # Update session state
                 st.session_state.analysis_count += 1
@@ -594,6 +700,8 @@ if analyze_button:
                     
                     # Progress bar
                     st.progress(match_percentage / 100)
+                    if match_confidence:
+                        st.caption(f"🎯 {describe_score_confidence(match_confidence)}")
                 else:
                     st.warning("⚠️ Could not extract match percentage. Review the analysis below.")
                 
@@ -618,6 +726,7 @@ if analyze_button:
                     
                     extracted_words = len(resume_text.split())
                     job_desc_words = len(job_description.split())
+                    confidence_note = f" ({describe_score_confidence(match_confidence)})" if match_confidence else ""
                     
                     detailed_report = f"""
 ===============================================================
@@ -626,7 +735,7 @@ if analyze_button:
 
 📊 ANALYSIS SUMMARY:
 • Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-• Match Score: {match_percentage}%
+• Match Score: {match_percentage}%{confidence_note}
 • Resume Words: {extracted_words:,}
 • Job Description Words: {job_desc_words:,}
 
@@ -641,7 +750,7 @@ if analyze_button:
 ===============================================================
 
 📌 Generated by ATS Resume Analyzer by safagoek
-🔗 Platform: OpenRouter API with DeepSeek Chat v3
+🔗 Platform: {backend.label}
 📅 Version: 2.0 | Date: {datetime.now().strftime('%Y-%m-%d')}
 
 💡 IMPORTANT NOTES:
@@ -728,6 +837,8 @@ elif st.session_state.analysis_result is not None:
         
         # Progress bar
         st.progress(match_percentage / 100)
+        if st.session_state.match_confidence:
+            st.caption(f"🎯 {describe_score_confidence(st.session_state.match_confidence)}")
     
     # Analysis Content
     st.markdown("### 📋 Analysis Report")
@@ -750,6 +861,8 @@ elif st.session_state.analysis_result is not None:
         
         extracted_words = len(st.session_state.resume_text.split())
         job_desc_words = len(st.session_state.job_description.split())
+        confidence = st.session_state.match_confidence
+        confidence_note = f" ({describe_score_confidence(confidence)})" if confidence else ""
         
         detailed_report = f"""
 ===============================================================
@@ -758,7 +871,7 @@ elif st.session_state.analysis_result is not None:
 
 📊 ANALYSIS SUMMARY:
 • Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-• Match Score: {st.session_state.match_percentage}%
+• Match Score: {st.session_state.match_percentage}%{confidence_note}
 • Resume Words: {extracted_words:,}
 • Job Description Words: {job_desc_words:,}
 
@@ -773,7 +886,7 @@ elif st.session_state.analysis_result is not None:
 ===============================================================
 
 📌 Generated by ATS Resume Analyzer by safagoek
-🔗 Platform: OpenRouter API with DeepSeek Chat v3
+🔗 Platform: {backend.label}
 📅 Version: 2.0 | Date: {datetime.now().strftime('%Y-%m-%d')}
 
 💡 IMPORTANT NOTES:
@@ -803,6 +916,7 @@ elif st.session_state.analysis_result is not None:
             st.session_state.resume_text = None
             st.session_state.job_description = None
             st.session_state.match_percentage = None
+            st.session_state.match_confidence = None
             st.rerun()
     
     st.markdown('</div>', unsafe_allow_html=True)
@@ -0,0 +1,371 @@
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from analyzer import consistent_match_score, extract_match_percentage, pdf_path_to_text, request_analysis_with_usage
+from job_model import compile_job_description, local_score
+from llm_backends import create_backend
+from result_store import ResultStore, build_record
+
+# Command-line batch runner for nightly screening jobs.
+#
+# PDFs are extracted in a process pool and LLM analyses run in a thread pool.
+# Every LLM request, score samples included, holds one of --concurrency
+# semaphore slots. Each finished pair is appended to a JSONL file as soon as
+# it completes. Finished pairs are recorded in a checkpoint file so
+# an interrupted run can be restarted with the same arguments and only the
+# missing pairs are processed.
+#
+#   python batch.py resumes/ --job backend.txt --job data.txt -o results.jsonl
+
+# Same minimums the Streamlit app enforces before analysing
+MIN_RESUME_CHARS = 100
+MIN_JOB_WORDS = 20
+
+# Finished pairs are written to the result store in groups of up to this many
+# rows, or at least this often. Their checkpoint lines follow the store write,
+# so a crash only means those pairs are analysed again on the next run.
+STORE_FLUSH_ROWS = 500
+STORE_FLUSH_SECONDS = 30
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_jobs(paths):
+    jobs = []
+    for path in paths:
+        path = Path(path)
+        files = sorted(path.glob("*.txt")) if path.is_dir() else [path]
+        for file in files:
+            text = file.read_text(encoding="utf-8").strip()
+            if len(text.split()) < MIN_JOB_WORDS:
+                print(f"⚠️  Skipping {file}: job description is too short", file=sys.stderr)
+                continue
+            jobs.append({"id": file.stem, "text": text, "sha256": sha256_bytes(text.encode("utf-8"))})
+    return jobs
+
+
+def load_checkpoint(path):
+    if not path.exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def pair_key(resume_hash, job_hash):
+    return f"{resume_hash}:{job_hash}"
+
+
+# Runs in a worker process
+def timed_extract(path):
+    started = time.perf_counter()
+    text = pdf_path_to_text(path)
+    return text, time.perf_counter() - started
+
+
+# Runs in a worker thread. With score_samples the consistent score is sampled
+# alongside the single narrative request; all of them share the limiter.
+def timed_analysis(backend, limiter, resume_text, job_text, job_model=None, score_samples=0, score_tolerance=5):
+    started = time.perf_counter()
+    scoring = None
+    if score_samples:
+        scoring = ThreadPoolExecutor(max_workers=1)
+        score_future = scoring.submit(consistent_match_score, backend, resume_text, job_text,
+                                      score_samples, min(3, score_samples), score_tolerance, job_model, limiter)
+    try:
+        with limiter:
+            analysis, usage = request_analysis_with_usage(backend, resume_text, job_text)
+        confidence = score_future.result() if scoring else None
+    finally:
+        if scoring:
+            scoring.shutdown(wait=False)
+    return analysis, usage, confidence, time.perf_counter() - started
+
+
+def describe(values):
+    if not values:
+        return "n=0"
+    ordered = sorted(values)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return (f"n={len(values)} mean={statistics.fmean(values):.2f}s "
+            f"p50={statistics.median(values):.2f}s p95={p95:.2f}s max={ordered[-1]:.2f}s")
+
+
+def print_report(records, skipped, failed, wall_time, backend):
+    out = sys.stderr
+    done = [r for r in records if "error" not in r]
+
+    print("\n=== Per-item timing ===", file=out)
+    for r in sorted(done, key=lambda r: -(r["extraction_s"] + r["analysis_s"])):
+        print(f"  {r['resume']:<40} {r['job']:<24} extract={r['extraction_s']:.2f}s "
+              f"analysis={r['analysis_s']:.2f}s score={r['match_percentage']}", file=out)
+
+    print("\n=== Summary ===", file=out)
+    print(f"Pairs analysed: {len(done)} | failed: {failed} | skipped (checkpoint): {skipped}", file=out)
+    rate = len(done) / wall_time * 60 if wall_time > 0 else 0.0
+    print(f"Wall time: {wall_time:.1f}s | Throughput: {rate:.1f} pairs/min", file=out)
+    # Extraction time is shared by every job of a resume, count it once
+    extraction = {r["resume"]: r["extraction_s"] for r in done}
+    print(f"Extraction: {describe(list(extraction.values()))}", file=out)
+    print(f"Analysis:   {describe([r['analysis_s'] for r in done])}", file=out)
+
+    # Per-request view of the backend (score samples and compiles included)
+    stats = backend.stats.snapshot()
+    latency = (f"p50={stats['latency_p50_s']:.2f}s p95={stats['latency_p95_s']:.2f}s"
+               if stats["latency_p50_s"] is not None else "n/a")
+    throughput = f"{stats['tokens_per_s']:.1f} tok/s" if stats["tokens_per_s"] else "n/a"
+    print(f"Backend {backend.label}: {stats['requests']} requests ({stats['failures']} failed) | "
+          f"latency {latency} | {throughput}", file=out)
+
+
+def local_fields(local_check):
+    if local_check is None:
+        return {}
+    return {"local_score": local_check["score"], "missing_must_have": local_check["missing_must_have"]}
+
+
+def select_pairs(resumes, jobs, top_k):
+    """Job indices to analyse per resume: only the top-k resumes of each job by local score."""
+    import matcher
+
+    names = list(resumes)
+    texts = [resumes[name]["text"] for name in names]
+    vocab = matcher.Vocabulary().fit(texts + [job["text"] for job in jobs])
+    pairs = matcher.top_pairs(vocab.encode(texts), vocab.encode([job["text"] for job in jobs]), top_k)
+    selected = {}
+    for resume_idx, job_idx, _ in pairs:
+        selected.setdefault(names[resume_idx], []).append(job_idx)
+    return selected
+
+
+def run(args):
+    load_dotenv()
+    try:
+        backend = create_backend(args.backend)
+    except Exception as e:
+        sys.exit(f"❌ LLM backend could not be started: {e}")
+
+    jobs = load_jobs(args.job)
+    if not jobs:
+        sys.exit("❌ No usable job descriptions found.")
+
+    resume_dir = Path(args.resumes)
+    pdfs = sorted(resume_dir.rglob("*.pdf"))
+    output = Path(args.output)
+    checkpoint_path = Path(args.checkpoint) if args.checkpoint else output.with_name(output.name + ".checkpoint")
+    finished = load_checkpoint(checkpoint_path)
+
+    # Hash up front so fully finished resumes are never re-extracted. With
+    # --top-k the whole pool is still extracted so the selection is stable
+    # across resumed runs.
+    resumes = {}
+    skipped = 0
+    for pdf in pdfs:
+        digest = sha256_bytes(pdf.read_bytes())
+        todo = [job for job in jobs if pair_key(digest, job["sha256"]) not in finished]
+        skipped += len(jobs) - len(todo)
+        if todo or args.top_k:
+            resumes[str(pdf.relative_to(resume_dir))] = {"path": str(pdf), "sha256": digest}
+
+    print(f"📄 {len(pdfs)} resumes × {len(jobs)} jobs | {skipped} pairs already done", file=sys.stderr)
+
+    # Compile every posting once up front; all pairs reuse the cached model
+    if not args.raw_job_text:
+        compile_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            models = pool.map(lambda job: compile_job_description(job["text"], backend), jobs)
+            for job, model in zip(jobs, models):
+                job["model"] = model
+        print(f"🧩 Compiled {len(jobs)} job descriptions in {time.perf_counter() - compile_started:.1f}s",
+              file=sys.stderr)
+
+    # Caps LLM requests in flight, narrative and score samples alike
+    limiter = threading.BoundedSemaphore(args.concurrency)
+    store = None if args.no_store else ResultStore(args.store)
+    records = []
+    failed = 0
+    started = time.perf_counter()
+
+    extract_pool = ProcessPoolExecutor(max_workers=args.workers)
+    llm_pool = ThreadPoolExecutor(max_workers=args.concurrency)
+    interrupted = False
+    try:
+        with open(output, "a", encoding="utf-8") as out, \
+                open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+
+            unflushed = []  # (store row, checkpoint key) of finished pairs
+            flushed_at = time.monotonic()
+
+            def flush_finished():
+                nonlocal flushed_at
+                flushed_at = time.monotonic()
+                if not unflushed:
+                    return
+                if store is not None:
+                    try:
+                        store.append([row for row, _ in unflushed])
+                    except Exception as e:
+                        print(f"⚠️  Could not save analysis statistics: {e}", file=sys.stderr)
+                # Checkpoint only after the result lines and store rows are safely written
+                for _, key in unflushed:
+                    checkpoint.write(key + "\n")
+                checkpoint.flush()
+                unflushed.clear()
+
+            def emit(record):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                records.append(record)
+
+            def submit_analyses(name, job_indices):
+                resume = resumes[name]
+                for idx in job_indices:
+                    job = jobs[idx]
+                    if pair_key(resume["sha256"], job["sha256"]) in finished:
+                        continue
+                    future = llm_pool.submit(timed_analysis, backend, limiter, resume["text"], job["text"],
+                                             job.get("model"), args.score_samples, args.score_tolerance)
+                    pending[future] = ("analysis", name, job)
+
+            pending = {extract_pool.submit(timed_extract, r["path"]): ("extract", name, None)
+                       for name, r in resumes.items()}
+            extracted = 0
+
+            try:
+                while pending:
+                    done, _ = wait(pending, timeout=STORE_FLUSH_SECONDS, return_when=FIRST_COMPLETED)
+                    if time.monotonic() - flushed_at >= STORE_FLUSH_SECONDS:
+                        flush_finished()
+                    for future in done:
+                        kind, name, job = pending.pop(future)
+                        resume = resumes[name]
+
+                        if kind == "extract":
+                            extracted += 1
+                            try:
+                                text, elapsed = future.result()
+                            except Exception as e:
+                                text, elapsed = "", 0.0
+                                error = f"PDF processing failed: {e}"
+                            else:
+                                error = None if len(text) > MIN_RESUME_CHARS else "Resume content too brief"
+                            if error:
+                                failed += 1
+                                emit({"resume": name, "resume_sha256": resume["sha256"], "error": error})
+                            else:
+                                resume["text"], resume["extraction_s"] = text, elapsed
+                                if not args.top_k:
+                                    submit_analyses(name, range(len(jobs)))
+                            # Top-k selection needs the whole pool extracted first
+                            if args.top_k and extracted == len(resumes):
+                                ready = {n: r for n, r in resumes.items() if "text" in r}
+                                for n, indices in select_pairs(ready, jobs, args.top_k).items():
+                                    submit_analyses(n, indices)
+                            continue
+
+                        try:
+                            analysis, usage, confidence, elapsed = future.result()
+                        except Exception as e:
+                            failed += 1
+                            emit({"resume": name, "job": job["id"], "resume_sha256": resume["sha256"],
+                                  "job_sha256": job["sha256"], "error": f"AI analysis failed: {e}"})
+                            continue
+
+                        job_model = job.get("model")
+                        local_check = local_score(resume["text"], job_model) if job_model else None
+                        record = {
+                            "resume": name,
+                            "job": job["id"],
+                            "resume_sha256": resume["sha256"],
+                            "job_sha256": job["sha256"],
+                            "match_percentage": (confidence["score"] if confidence
+                                                 else extract_match_percentage(analysis or "")),
+                            "match_confidence": confidence,
+                            **local_fields(local_check),
+                            "usage": usage,
+                            "model": backend.label,
+                            "extraction_s": round(resume["extraction_s"], 3),
+                            "analysis_s": round(elapsed, 3),
+                            "completed_at": datetime.now().isoformat(timespec="seconds"),
+                            "analysis": analysis,
+                        }
+                        emit(record)
+                        row = None
+                        if store is not None:
+                            row = build_record(
+                                "batch", backend.label, job_desc=job["text"], job_model=job_model,
+                                resume_sha256=resume["sha256"], match_percentage=record["match_percentage"],
+                                confidence=confidence, local_check=local_check, usage=usage,
+                                timings={"extraction_s": resume["extraction_s"], "analysis_s": elapsed,
+                                         "total_s": resume["extraction_s"] + elapsed},
+                            )
+                        key = pair_key(resume["sha256"], job["sha256"])
+                        unflushed.append((row, key))
+                        finished.add(key)
+                        if store is None or len(unflushed) >= STORE_FLUSH_ROWS:
+                            flush_finished()
+                        print(f"✅ {name} × {job['id']}: {record['match_percentage']}% "
+                              f"({record['analysis_s']:.1f}s)", file=sys.stderr)
+            except KeyboardInterrupt:
+                interrupted = True
+                running = sum(1 for future, (kind, _, _) in pending.items() if kind == "analysis" and future.running())
+                print("\n⏹️  Interrupted, finished pairs are checkpointed. Re-run to resume.", file=sys.stderr)
+                if running:
+                    print(f"   Waiting for up to {running} requests already sent to the LLM before exiting, "
+                          f"press Ctrl+C again to quit now. Their pairs run again on the next run.",
+                          file=sys.stderr)
+            finally:
+                flush_finished()
+
+    finally:
+        # After Ctrl+C, report right away instead of blocking on requests in flight
+        extract_pool.shutdown(wait=not interrupted, cancel_futures=interrupted)
+        llm_pool.shutdown(wait=not interrupted, cancel_futures=interrupted)
+
+    print_report(records, skipped, failed, time.perf_counter() - started, backend)
+    if interrupted:
+        return 130
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch ATS resume analysis over a directory of PDFs.")
+    parser.add_argument("resumes", help="Directory containing resume PDFs (searched recursively)")
+    parser.add_argument("-j", "--job", action="append", required=True,
+                        help="Job description .txt file or directory of .txt files (repeatable)")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="PDF extraction processes")
+    # No default here: create_backend() reads LLM_BACKEND once .env is loaded
+    parser.add_argument("--backend", choices=["openrouter", "llamacpp-server", "llamacpp", "stub"],
+                        help="LLM backend (default: LLM_BACKEND from the environment or .env, else openrouter)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent LLM requests")
+    parser.add_argument("--score-samples", type=int, default=0,
+                        help="Maximum score-only samples per pair for a consistent median score (0 = off); "
+                             "samples count against --concurrency")
+    parser.add_argument("--score-tolerance", type=int, default=5,
+                        help="Stop sampling once the 95%% interval of the median is within ± this many points")
+    parser.add_argument("--raw-job-text", action="store_true",
+                        help="Don't compile job descriptions: score samples get the raw text and "
+                             "results have no local score")
+    parser.add_argument("--store", help="Result store directory for analytics (default: RESULT_STORE_DIR or data/analyses)")
+    parser.add_argument("--no-store", action="store_true", help="Don't record results in the result store")
+    parser.add_argument("--top-k", type=int, default=0,
+                        help="Only analyse the top K resumes per job by local match score (0 = all pairs)")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from matcher import SKILL_PHRASES, tokenize
+
+# Job description compilation.
+#
+# A posting is parsed once into a structured requirements model (must-have vs
+# nice-to-have skills, years of experience, education and weighted keywords)
+# and cached by the hash of its text, in memory and on disk. Score-only
+# requests for the same posting then send the compact model instead of the raw
+# text, and the local scorer matches resumes against it without calling the
+# LLM. The narrative report always gets the original posting.
+
+# Bump when the model format or the compile prompt changes to invalidate caches
+COMPILER_VERSION = 1
+
+# Default disk cache, overridden by JOB_MODEL_CACHE_DIR (read per call so .env applies)
+DEFAULT_CACHE_DIR = os.path.join(".cache", "job_models")
+
+# Seconds a heuristic fallback after a failed LLM compile is served before the
+# LLM is tried again
+FALLBACK_RETRY_S = 60
+
+COMPILE_PROMPT = """
+Extract the hiring requirements from the job description below. Respond with ONLY a JSON object, no prose and no code fences, using exactly these fields:
+
+{
+  "title": "job title or null",
+  "must_have": ["required skills, tools or qualifications"],
+  "nice_to_have": ["preferred / bonus skills"],
+  "min_years_experience": 3,
+  "education": "minimum degree and field, or null",
+  "responsibilities": ["up to 6 short phrases"],
+  "keywords": {"ATS keyword": 0.8}
+}
+
+Use null when the posting does not say. Give 10-25 keywords with weights between 0 and 1 reflecting how important each is to the employer. Keep every list item short (a skill or phrase, not a sentence).
+"""
+
+_cache = {}
+_cache_lock = threading.Lock()
+_compile_locks = {}
+_fallback_expiry = {}
+
+# Posting boilerplate that says nothing about the requirements
+_BOILERPLATE = frozenset("""
+requirements responsibilities qualifications preferred required hiring join looking role
+position company candidate candidates opportunity apply benefits offer ideal seeking
+""".split())
+
+_PREFERRED_HEADING = re.compile(
+    r"(preferred|nice[\s-]to[\s-]have|bonus|a plus|desirable|good to have|optional)", re.IGNORECASE)
+_YEARS = re.compile(r"(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?(?:years|yrs)", re.IGNORECASE)
+_EDUCATION = re.compile(
+    r"(ph\.?d|doctorate|master'?s?|m\.?sc|mba|bachelor'?s?|b\.?sc|b\.?s\.|degree)[^.\n;]*", re.IGNORECASE)
+
+
+def job_hash(job_desc):
+    normalized = " ".join(job_desc.split())
+    return hashlib.sha256(f"v{COMPILER_VERSION}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def _as_list(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    seen, items = set(), []
+    for item in value:
+        item = str(item).strip()
+        if item and item.lower() not in seen:
+            seen.add(item.lower())
+            items.append(item)
+    return items
+
+
+def _normalize(raw, key, compiled_by):
+    keywords = {}
+    for term, weight in (raw.get("keywords") or {}).items():
+        try:
+            keywords[str(term).strip()] = round(min(1.0, max(0.0, float(weight))), 3)
+        except (TypeError, ValueError):
+            continue
+    years = raw.get("min_years_experience")
+    try:
+        years = int(years) if years is not None else None
+    except (TypeError, ValueError):
+        years = None
+    return {
+        "job_hash": key,
+        "title": raw.get("title") or None,
+        "must_have": _as_list(raw.get("must_have")),
+        "nice_to_have": _as_list(raw.get("nice_to_have")),
+        "min_years_experience": years,
+        "education": raw.get("education") or None,
+        "responsibilities": _as_list(raw.get("responsibilities"))[:6],
+        "keywords": keywords,
+        "compiled_by": compiled_by,
+    }
+
+
+def _skills_in(text):
+    terms = tokenize(text)
+    return [skill for skill in SKILL_PHRASES if f"skill:{skill}" in terms]
+
+
+def compile_heuristic(job_desc, key=None):
+    """Rule-based compile used without an LLM backend or when the LLM reply is unusable."""
+    key = key or job_hash(job_desc)
+
+    # Lines under a "Preferred / Nice to have" heading count as optional
+    required_lines, preferred_lines = [], []
+    target = required_lines
+    for line in job_desc.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        is_heading = len(stripped) < 60 and not stripped.startswith(("-", "•", "*"))
+        if is_heading:
+            target = preferred_lines if _PREFERRED_HEADING.search(stripped) else required_lines
+        elif _PREFERRED_HEADING.search(stripped):
+            preferred_lines.append(stripped)
+            continue
+        target.append(stripped)
+
+    must_have = _skills_in("\n".join(required_lines))
+    nice_to_have = [s for s in _skills_in("\n".join(preferred_lines)) if s not in must_have]
+
+    years = [int(y) for y in _YEARS.findall(job_desc) if 0 < int(y) <= 40]
+    education = _EDUCATION.search(job_desc)
+
+    counts = Counter({term: count for term, count in tokenize(job_desc).items()
+                      if len(term) > 2 and term not in _BOILERPLATE})
+    top = counts.most_common(20)
+    keywords = {}
+    if top:
+        highest = top[0][1]
+        for term, count in top:
+            keywords[term.replace("skill:", "")] = max(keywords.get(term.replace("skill:", ""), 0.0),
+                                                       count / highest)
+
+    return _normalize({
+        "title": job_desc.strip().splitlines()[0][:80] if job_desc.strip() else None,
+        "must_have": must_have,
+        "nice_to_have": nice_to_have,
+        "min_years_experience": min(years) if years else None,
+        "education": education.group(0).strip() if education else None,
+        "keywords": keywords,
+    }, key, "heuristic")
+
+
+def _compile_with_llm(backend, job_desc, key):
+    completion = backend.complete(
+        messages=[{"role": "user", "content": f"{COMPILE_PROMPT}\n\n**JOB DESCRIPTION:**\n{job_desc}"}],
+        temperature=0,
+        max_tokens=1200
+    )
+    content = completion.text
+    start, end = content.find("{"), content.rfind("}")
+    raw = json.loads(content[start:end + 1])
+    model = _normalize(raw, key, backend.label)
+    if not (model["must_have"] or model["keywords"]):
+        raise ValueError("compiled model has no requirements")
+    return model
+
+
+def _cached(key):
+    # Caller holds _cache_lock
+    expiry = _fallback_expiry.get(key)
+    return key in _cache and (expiry is None or time.monotonic() < expiry)
+
+
+def compile_job_description(job_desc, backend=None, cache_dir=None):
+    """Compiled requirements model for a posting, reusing any cached compile.
+
+    Concurrent calls for the same posting wait for a single compile. Falls back
+    to the heuristic compiler when no backend is given or the LLM call fails,
+    so this never raises for bad input. A fallback caused by an LLM failure is
+    only reused for FALLBACK_RETRY_S seconds, then the LLM is tried again.
+
+    ``cache_dir`` defaults to JOB_MODEL_CACHE_DIR; pass ``""`` to skip the
+    disk cache.
+    """
+    if cache_dir is None:
+        cache_dir = os.getenv("JOB_MODEL_CACHE_DIR", DEFAULT_CACHE_DIR)
+    key = job_hash(job_desc)
+    with _cache_lock:
+        if _cached(key):
+            return _cache[key]
+        lock = _compile_locks.setdefault(key, threading.Lock())
+
+    with lock:
+        with _cache_lock:
+            if _cached(key):
+                return _cache[key]
+
+        model = None
+        llm_failed = False
+        path = _cache_path(key, cache_dir) if cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    model = json.load(f)
+            except (OSError, ValueError):
+                model = None
+
+        if model is None:
+            if backend is not None:
+                try:
+                    model = _compile_with_llm(backend, job_desc, key)
+                except Exception:
+                    llm_failed = True
+            if model is None:
+                model = compile_heuristic(job_desc, key)
+            # Heuristic and stub results are cheap to redo, only persist real LLM compiles
+            if path and model["compiled_by"] != "heuristic" and backend.name != "stub":
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(model, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, path)
+
+        with _cache_lock:
+            _cache[key] = model
+            if llm_failed:
+                _fallback_expiry[key] = time.monotonic() + FALLBACK_RETRY_S
+            else:
+                _fallback_expiry.pop(key, None)
+            _compile_locks.pop(key, None)
+        return model
+
+
+def render_job_model(model):
+    """Compact prompt text for a compiled model, used in score-only prompts."""
+    lines = []
+    if model.get("title"):
+        lines.append(f"Title: {model['title']}")
+    if model["must_have"]:
+        lines.append(f"Must-have: {', '.join(model['must_have'])}")
+    if model["nice_to_have"]:
+        lines.append(f"Nice-to-have: {', '.join(model['nice_to_have'])}")
+    if model.get("min_years_experience") is not None:
+        lines.append(f"Minimum experience: {model['min_years_experience']} years")
+    if model.get("education"):
+        lines.append(f"Education: {model['education']}")
+    if model["responsibilities"]:
+        lines.append(f"Responsibilities: {'; '.join(model['responsibilities'])}")
+    if model["keywords"]:
+        ranked = sorted(model["keywords"].items(), key=lambda kv: -kv[1])
+        lines.append("Keywords (weight): " + ", ".join(f"{term} ({weight:.1f})" for term, weight in ranked))
+    return "\n".join(lines)
+
+
+def _mentions(text, term):
+    pattern = r"(?<![a-z0-9])" + re.escape(term.lower()) + r"(?![a-z0-9+#])"
+    return re.search(pattern, text) is not None
+
+
+def local_score(resume_text, model):
+    """Score a resume against a compiled model without the LLM (0-100).
+
+    Must-have coverage weighs 50%, weighted keyword coverage 35% and
+    nice-to-have coverage 15%; empty parts are left out of the weighting.
+    """
+    text = resume_text.lower()
+    matched_must = [s for s in model["must_have"] if _mentions(text, s)]
+    matched_nice = [s for s in model["nice_to_have"] if _mentions(text, s)]
+    keyword_total = sum(model["keywords"].values())
+    keyword_hit = sum(w for term, w in model["keywords"].items() if _mentions(text, term))
+
+    parts = []
+    if model["must_have"]:
+        parts.append((0.5, len(matched_must) / len(model["must_have"])))
+    if keyword_total:
+        parts.append((0.35, keyword_hit / keyword_total))
+    if model["nice_to_have"]:
+        parts.append((0.15, len(matched_nice) / len(model["nice_to_have"])))
+    weight = sum(w for w, _ in parts)
+    score = round(100 * sum(w * v for w, v in parts) / weight) if weight else None
+
+    return {
+        "score": score,
+        "matched": matched_must + matched_nice,
+        "missing_must_have": [s for s in model["must_have"] if s not in matched_must],
+        "missing_nice_to_have": [s for s in model["nice_to_have"] if s not in matched_nice],
+    }
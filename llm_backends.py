@@ -0,0 +1,268 @@
+import json
+import os
+import re
+import statistics
+import threading
+import time
+from collections import deque
+
+# Pluggable LLM backends.
+#
+# Everything that talks to a model (analysis, score sampling, job compilation
+# and the Test API button) goes through LLMBackend.complete(), so the model
+# behind it is chosen by configuration:
+#
+#   LLM_BACKEND=openrouter        OpenRouter API (default)
+#   LLM_BACKEND=llamacpp-server   OpenAI-compatible local server, e.g. llama.cpp's
+#                                 `llama-server -m model.gguf` on localhost
+#   LLM_BACKEND=llamacpp          in-process quantized GGUF model via llama-cpp-python
+#   LLM_BACKEND=stub              deterministic offline backend for tests and demos
+#
+# Every backend keeps latency and throughput statistics for reporting.
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_MODEL = "deepseek/deepseek-chat-v3-0324:free"
+
+LOCAL_SERVER_URL = "http://localhost:8080/v1"
+
+
+class Completion:
+    def __init__(self, text, prompt_tokens=None, completion_tokens=None, latency_s=0.0):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.latency_s = latency_s
+
+    @property
+    def usage(self):
+        total = None
+        if self.prompt_tokens is not None and self.completion_tokens is not None:
+            total = self.prompt_tokens + self.completion_tokens
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": total,
+        }
+
+
+class BackendStats:
+    """Thread-safe request latency and token throughput counters."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.busy_s = 0.0
+        self.completion_tokens = 0
+        self.started = time.monotonic()
+
+    def record(self, latency_s, completion_tokens=None, failed=False):
+        with self._lock:
+            self.requests += 1
+            self.busy_s += latency_s
+            if failed:
+                self.failures += 1
+                return
+            self._latencies.append(latency_s)
+            self.completion_tokens += completion_tokens or 0
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            elapsed = time.monotonic() - self.started
+            p95 = latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))] if latencies else None
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "latency_mean_s": statistics.fmean(latencies) if latencies else None,
+                "latency_p50_s": statistics.median(latencies) if latencies else None,
+                "latency_p95_s": p95,
+                # Generation speed while a request is in flight
+                "tokens_per_s": self.completion_tokens / self.busy_s if self.busy_s else None,
+                "requests_per_min": self.requests / elapsed * 60 if elapsed else None,
+            }
+
+
+class LLMBackend:
+    name = "base"
+
+    def __init__(self, model):
+        self.model = model
+        self.stats = BackendStats()
+
+    @property
+    def label(self):
+        return f"{self.name}:{self.model}"
+
+    def complete(self, messages, max_tokens=1000, temperature=0.1):
+        """Run a chat completion, raising on backend errors."""
+        started = time.perf_counter()
+        try:
+            text, prompt_tokens, completion_tokens = self._complete(messages, max_tokens, temperature)
+        except Exception:
+            self.stats.record(time.perf_counter() - started, failed=True)
+            raise
+        latency = time.perf_counter() - started
+        self.stats.record(latency, completion_tokens)
+        return Completion(text or "", prompt_tokens, completion_tokens, latency)
+
+    def ping(self):
+        return self.complete([{"role": "user", "content": "Test"}], max_tokens=10)
+
+    def _complete(self, messages, max_tokens, temperature):
+        raise NotImplementedError
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Any server speaking the OpenAI chat completions API."""
+
+    name = "openai-compatible"
+
+    def __init__(self, base_url, api_key, model, extra_headers=None, timeout=None):
+        from openai import OpenAI
+
+        super().__init__(model)
+        # Only override the SDK's finite default timeout when one is given
+        options = {"timeout": timeout} if timeout is not None else {}
+        self.client = OpenAI(base_url=base_url, api_key=api_key, **options)
+        self.extra_headers = extra_headers or {}
+
+    def _complete(self, messages, max_tokens, temperature):
+        completion = self.client.chat.completions.create(
+            extra_headers=self.extra_headers,
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        usage = completion.usage
+        return (completion.choices[0].message.content,
+                getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+
+
+class OpenRouterBackend(OpenAICompatibleBackend):
+    name = "openrouter"
+
+    def __init__(self, api_key, model=OPENROUTER_MODEL, site_url=None, site_name=None):
+        headers = {}
+        if site_url:
+            headers["HTTP-Referer"] = site_url
+        if site_name:
+            headers["X-Title"] = site_name
+        super().__init__(OPENROUTER_BASE_URL, api_key, model, headers)
+
+
+class LlamaCppServerBackend(OpenAICompatibleBackend):
+    """Local llama.cpp server (or any OpenAI-compatible server on localhost)."""
+
+    name = "llamacpp-server"
+
+    def __init__(self, base_url=LOCAL_SERVER_URL, model="local", api_key="sk-no-key-required"):
+        super().__init__(base_url, api_key, model)
+
+
+class LlamaCppBackend(LLMBackend):
+    """Quantized GGUF model running in-process on the CPU via llama-cpp-python."""
+
+    name = "llamacpp"
+
+    def __init__(self, model_path, n_ctx=8192, n_threads=None):
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise RuntimeError("The llamacpp backend needs llama-cpp-python: pip install llama-cpp-python")
+
+        super().__init__(os.path.basename(model_path))
+        self._llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        self._lock = threading.Lock()  # a Llama instance serves one request at a time
+
+    def _complete(self, messages, max_tokens, temperature):
+        with self._lock:
+            result = self._llm.create_chat_completion(
+                messages=messages, max_tokens=max_tokens, temperature=temperature)
+        usage = result.get("usage") or {}
+        return (result["choices"][0]["message"]["content"],
+                usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+
+class StubBackend(LLMBackend):
+    """Deterministic offline backend.
+
+    Scores come from lexical similarity between the resume and job sections of
+    the prompt, so identical inputs always give identical output and better
+    matches score higher. Job compilation prompts get the heuristic model.
+    """
+
+    name = "stub"
+
+    def __init__(self, model="deterministic"):
+        super().__init__(model)
+
+    @staticmethod
+    def _section(prompt, marker):
+        match = re.search(re.escape(marker) + r"[^\n]*\n(.*?)(?=\n\*\*[A-Z][A-Z ()a-z]*:\*\*|\Z)", prompt, re.S)
+        return match.group(1) if match else ""
+
+    def _score(self, prompt):
+        import matcher
+
+        resume = self._section(prompt, "**RESUME CONTENT:**")
+        job = self._section(prompt, "**JOB")
+        if not resume.strip() or not job.strip():
+            return 0
+        vocab = matcher.Vocabulary().fit([resume, job])
+        return int(round(float(matcher.score_matrix(vocab.encode([resume]), vocab.encode([job]))[0, 0])))
+
+    def _complete(self, messages, max_tokens, temperature):
+        prompt = messages[-1]["content"]
+        if "Extract the hiring requirements" in prompt:
+            from job_model import compile_heuristic
+
+            model = compile_heuristic(self._section(prompt, "**JOB DESCRIPTION:**"))
+            text = json.dumps({key: model[key] for key in (
+                "title", "must_have", "nice_to_have", "min_years_experience", "education",
+                "responsibilities", "keywords")})
+        elif "RESUME CONTENT" in prompt:
+            score = self._score(prompt)
+            if max_tokens <= 20:
+                text = f"{score}%"
+            else:
+                text = (f"1. **MATCH PERCENTAGE**: {score}%\n\n"
+                        "This report was produced by the offline stub backend from lexical overlap "
+                        "between the resume and the job description. Configure a real LLM backend "
+                        "for detailed strengths, gaps and recommendations.")
+        else:
+            text = "OK"
+        words = len(prompt.split())
+        return text, words, len(text.split())
+
+
+def create_backend(name=None, get=None):
+    """Backend selected by configuration.
+
+    ``get(key, default)`` reads settings (defaults to environment variables):
+    LLM_BACKEND, OPENROUTER_API_KEY, OPENROUTER_MODEL, SITE_URL, SITE_NAME,
+    LOCAL_LLM_URL, LOCAL_LLM_MODEL, LOCAL_MODEL_PATH, LOCAL_MODEL_CTX and
+    LOCAL_MODEL_THREADS.
+    """
+    get = get or (lambda key, default=None: os.getenv(key, default))
+    name = (name or get("LLM_BACKEND", "openrouter")).lower()
+
+    if name == "openrouter":
+        api_key = get("OPENROUTER_API_KEY")
+        if not api_key:
+            raise ValueError("OPENROUTER_API_KEY is required for the openrouter backend")
+        return OpenRouterBackend(api_key, get("OPENROUTER_MODEL", OPENROUTER_MODEL),
+                                 get("SITE_URL"), get("SITE_NAME"))
+    if name == "llamacpp-server":
+        return LlamaCppServerBackend(get("LOCAL_LLM_URL", LOCAL_SERVER_URL), get("LOCAL_LLM_MODEL", "local"))
+    if name == "llamacpp":
+        model_path = get("LOCAL_MODEL_PATH")
+        if not model_path:
+            raise ValueError("LOCAL_MODEL_PATH is required for the llamacpp backend")
+        threads = get("LOCAL_MODEL_THREADS")
+        return LlamaCppBackend(model_path, int(get("LOCAL_MODEL_CTX", "8192")), int(threads) if threads else None)
+    if name == "stub":
+        return StubBackend()
+    raise ValueError(f"Unknown LLM_BACKEND '{name}' (openrouter, llamacpp-server, llamacpp, stub)")
@@ -0,0 +1,196 @@
+import json
+import math
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+# Bulk resume × job scoring for talent pools.
+#
+# Resumes and job descriptions are encoded into sparse TF-IDF matrices over a
+# shared vocabulary of single terms and known skill phrases. The full score
+# matrix is then a single sparse product (resumes @ jobs.T), computed in row
+# chunks so memory stays bounded for large pools. Scores are cosine
+# similarities scaled to 0-100 so they read like the LLM match percentage.
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the
+their this to was were will with you your we us they them who which what
+able ability including etc such also other more most must should can may
+years year experience work working team strong good excellent knowledge
+""".split())
+
+# Multi-word and ambiguous skills that plain tokenisation would split or miss.
+# Matches are added as "skill:<name>" features with a boosted weight.
+SKILL_PHRASES = (
+    "machine learning", "deep learning", "data science", "data analysis",
+    "data engineering", "natural language processing", "computer vision",
+    "project management", "product management", "customer service",
+    "software development", "software engineering", "web development",
+    "unit testing", "test automation", "continuous integration",
+    "ci/cd", "rest api", "restful api", "microservices", "cloud computing",
+    "amazon web services", "google cloud", "power bi", "business intelligence",
+    "version control", "agile", "scrum", "kanban", "devops", "mlops",
+    "c++", "c#", ".net", "node.js", "react", "angular", "vue", "typescript",
+    "javascript", "python", "java", "golang", "rust", "kotlin", "swift",
+    "sql", "nosql", "postgresql", "mysql", "mongodb", "redis", "kafka",
+    "spark", "hadoop", "airflow", "docker", "kubernetes", "terraform",
+    "aws", "azure", "gcp", "linux", "git", "tableau", "excel", "pandas",
+    "pytorch", "tensorflow", "scikit-learn", "figma", "salesforce", "sap",
+)
+SKILL_WEIGHT = 2.0
+
+_SKILL_PATTERNS = [
+    (skill, re.compile(r"(?<![a-z0-9])" + re.escape(skill) + r"(?![a-z0-9+#])"))
+    for skill in SKILL_PHRASES
+]
+
+
+def tokenize(text):
+    """Split text into weighted term counts: plain terms plus skill features."""
+    text = (text or "").lower()
+    counts = Counter(
+        token for token in TOKEN_PATTERN.findall(text)
+        if token not in STOP_WORDS and not token.isdigit()
+    )
+    for skill, pattern in _SKILL_PATTERNS:
+        hits = len(pattern.findall(text))
+        if hits:
+            counts[f"skill:{skill}"] += hits * SKILL_WEIGHT
+    return counts
+
+
+class Vocabulary:
+    """Shared term index and document frequencies for resumes and jobs."""
+
+    def __init__(self, terms=None, doc_freq=None, n_docs=0):
+        self.terms = list(terms or [])
+        self.index = {term: i for i, term in enumerate(self.terms)}
+        self.doc_freq = list(doc_freq or [0] * len(self.terms))
+        self.n_docs = n_docs
+
+    def __len__(self):
+        return len(self.terms)
+
+    def fit(self, texts, min_df=1):
+        """Add the terms of ``texts`` to the vocabulary and update frequencies."""
+        df = Counter()
+        for text in texts:
+            df.update(tokenize(text).keys())
+            self.n_docs += 1
+        for term, freq in df.items():
+            if term in self.index:
+                self.doc_freq[self.index[term]] += freq
+            elif freq >= min_df:
+                self.index[term] = len(self.terms)
+                self.terms.append(term)
+                self.doc_freq.append(freq)
+        return self
+
+    def idf(self):
+        df = np.asarray(self.doc_freq, dtype=np.float32)
+        return np.log((1.0 + self.n_docs) / (1.0 + df)).astype(np.float32) + 1.0
+
+    def encode(self, texts):
+        """Encode texts as an L2-normalised sparse TF-IDF matrix (CSR, float32).
+
+        Terms not in the vocabulary are ignored, so new documents can be
+        encoded against a persisted vocabulary without refitting.
+        """
+        indptr = [0]
+        indices = []
+        data = []
+        for text in texts:
+            for term, count in tokenize(text).items():
+                col = self.index.get(term)
+                if col is not None:
+                    indices.append(col)
+                    data.append(1.0 + math.log(count))
+            indptr.append(len(indices))
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(indptr) - 1, len(self)),
+        )
+        matrix = matrix @ sparse.diags(self.idf())
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).astype(np.float32) @ matrix
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"n_docs": self.n_docs, "terms": self.terms, "doc_freq": self.doc_freq}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["terms"], data["doc_freq"], data["n_docs"])
+
+
+def iter_score_chunks(resume_matrix, job_matrix, chunk_size=2048):
+    """Yield ``(row_offset, scores)`` blocks of the resume × job score matrix.
+
+    Only ``chunk_size`` resume rows are densified at a time, which bounds
+    peak memory to ``chunk_size * n_jobs`` floats.
+    """
+    job_t = job_matrix.T.tocsc()
+    for start in range(0, resume_matrix.shape[0], chunk_size):
+        block = resume_matrix[start:start + chunk_size] @ job_t
+        yield start, block.toarray() * 100.0
+
+
+def score_matrix(resume_matrix, job_matrix, chunk_size=2048):
+    """Compute the full resume × job score matrix (0-100, float32)."""
+    scores = np.empty((resume_matrix.shape[0], job_matrix.shape[0]), dtype=np.float32)
+    for start, block in iter_score_chunks(resume_matrix, job_matrix, chunk_size):
+        scores[start:start + block.shape[0]] = block
+    return scores
+
+
+def _top_k_rows(block, k):
+    k = min(k, block.shape[1])
+    idx = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(block, idx, axis=1)
+    order = np.argsort(-top, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+def top_k_jobs(resume_matrix, job_matrix, k=10, chunk_size=2048):
+    """Best ``k`` jobs for every resume, as ``(indices, scores)`` arrays.
+
+    Computed chunk by chunk, so the full score matrix is never held in memory.
+    """
+    indices, scores = [], []
+    for _, block in iter_score_chunks(resume_matrix, job_matrix, chunk_size):
+        idx, top = _top_k_rows(block, k)
+        indices.append(idx)
+        scores.append(top)
+    if not indices:
+        return np.empty((0, 0), dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    return np.vstack(indices), np.vstack(scores)
+
+
+def top_k_resumes(resume_matrix, job_matrix, k=10, chunk_size=2048):
+    """Best ``k`` resumes for every job, as ``(indices, scores)`` arrays."""
+    return top_k_jobs(job_matrix, resume_matrix, k, chunk_size)
+
+
+def top_pairs(resume_matrix, job_matrix, k_per_job=10, min_score=0.0, chunk_size=2048):
+    """Most promising ``(resume_index, job_index, score)`` pairs to send to the LLM.
+
+    Only pairs scoring above ``min_score`` are returned, so pairs with no
+    shared terms at all are never selected.
+    """
+    indices, scores = top_k_resumes(resume_matrix, job_matrix, k_per_job, chunk_size)
+    pairs = [
+        (int(resume), job, float(score))
+        for job, (row_idx, row_scores) in enumerate(zip(indices, scores))
+        for resume, score in zip(row_idx, row_scores)
+        if score > min_score
+    ]
+    pairs.sort(key=lambda pair: -pair[2])
+    return pairs
@@ -0,0 +1,124 @@
+import streamlit as st
+import os
+import time
+from datetime import datetime, timedelta
+import pyarrow as pa
+from dotenv import load_dotenv
+
+# This page can be opened directly, so load the environment here too
+load_dotenv()
+
+from result_store import ResultStore
+
+# Streamlit Page Configuration
+st.set_page_config(
+    page_title="Analytics - ATS Resume Analyzer",
+    page_icon="📈",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Same lookup as the main app: Streamlit secrets first, then environment variables
+try:
+    store_dir = st.secrets.get("RESULT_STORE_DIR", os.getenv("RESULT_STORE_DIR"))
+except FileNotFoundError:  # no secrets.toml
+    store_dir = os.getenv("RESULT_STORE_DIR")
+store = ResultStore(store_dir)
+
+st.markdown("## 📈 Analysis Analytics")
+st.caption(f"Result store: `{store.path}`")
+
+# Filters
+PERIODS = {
+    "Last 7 days": timedelta(days=7),
+    "Last 30 days": timedelta(days=30),
+    "Last 90 days": timedelta(days=90),
+    "All time": None,
+}
+
+with st.sidebar:
+    st.markdown("### 🔎 Filters")
+    period = st.selectbox("Period", list(PERIODS), index=1)
+    since = datetime.now() - PERIODS[period] if PERIODS[period] else None
+
+    jobs = store.jobs(since=since)
+    job_labels = {"All postings": None}
+    for job_hash, title, count in jobs:
+        job_labels[f"{title or job_hash[:12]} ({count})"] = job_hash
+    job_choice = st.selectbox("Job posting", list(job_labels))
+
+    source = st.selectbox("Source", ["All", "app", "batch"])
+
+    st.markdown("---")
+    if st.button("🗜️ Compact store", help="Merge small result files for faster queries"):
+        merged = store.compact(full=True)
+        if merged:
+            st.success(f"✅ Merged {merged} files")
+        else:
+            st.info("Nothing to compact right now")
+
+filters = {
+    "since": since,
+    "job_hash": job_labels[job_choice],
+    "source": None if source == "All" else source,
+}
+
+query_started = time.perf_counter()
+summary = store.summary(**filters)
+distribution = store.score_distribution(**filters)
+missing_skills = store.top_missing_skills(limit=15, **filters)
+matched_skills = store.top_matched_skills(limit=15, **filters)
+query_ms = (time.perf_counter() - query_started) * 1000
+
+overall = summary["overall"]
+if overall["analyses"] == 0:
+    st.info("No analyses recorded for these filters yet. Run an analysis or a batch job first.")
+    st.stop()
+
+# Headline metrics
+col1, col2, col3, col4, col5 = st.columns(5)
+col1.metric("Analyses", f"{overall['analyses']:,}")
+col2.metric("Average score", f"{distribution['mean']:.1f}%" if distribution["mean"] is not None else "–")
+col3.metric("Median score", f"{distribution['median']:.0f}%" if distribution["median"] is not None else "–")
+col4.metric("Avg analysis time", f"{overall['avg_analysis_s']:.1f}s" if overall["avg_analysis_s"] is not None else "–")
+col5.metric("Total tokens", f"{overall['sum_total_tokens'] or 0:,}")
+
+# Score distribution
+st.markdown("### 📊 Score Distribution")
+labels = [f"{low}–{high}%" for low, high in distribution["bins"]]
+st.bar_chart(pa.table({"Score range": labels, "Analyses": distribution["histogram"]}).to_pandas(),
+             x="Score range", y="Analyses")
+if distribution["p25"] is not None:
+    st.caption(f"Interquartile range: {distribution['p25']:.0f}% – {distribution['p75']:.0f}%")
+
+# Skills
+col_missing, col_matched = st.columns(2)
+with col_missing:
+    st.markdown("### ❌ Most Common Missing Skills")
+    if missing_skills:
+        st.dataframe(pa.table({"Skill": [s for s, _ in missing_skills],
+                               "Analyses": [c for _, c in missing_skills]}).to_pandas(),
+                     hide_index=True, use_container_width=True)
+    else:
+        st.caption("No skill gaps recorded.")
+with col_matched:
+    st.markdown("### ✅ Most Common Matched Skills")
+    if matched_skills:
+        st.dataframe(pa.table({"Skill": [s for s, _ in matched_skills],
+                               "Analyses": [c for _, c in matched_skills]}).to_pandas(),
+                     hide_index=True, use_container_width=True)
+    else:
+        st.caption("No matched skills recorded.")
+
+# Per model
+st.markdown("### 🤖 By Model")
+st.dataframe(
+    pa.Table.from_pylist(summary["per_model"]).select(
+        ["model", "model_count", "match_percentage_mean", "analysis_s_mean", "total_tokens_mean"]
+    ).rename_columns(
+        ["Model", "Analyses", "Avg score", "Avg analysis time (s)", "Avg tokens"]
+    ).to_pandas(),
+    hide_index=True, use_container_width=True
+)
+
+st.caption(f"⚡ Queried in {query_ms:.0f} ms")
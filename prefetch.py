@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import CancelledError
+
+# Speculative prefetch for the Streamlit app.
+#
+# Extraction starts as soon as a PDF is uploaded. Once the job description is
+# also present, analysis is scheduled in a background worker that first waits
+# for the inputs to stay unchanged for the debounce window. Clicking the
+# analyze button then attaches to the in-flight or finished work instead of
+# starting from scratch, skipping whatever is left of the debounce. Workers
+# never touch Streamlit; errors are raised from the futures and reported by
+# the caller.
+
+
+def input_signature(pdf_bytes, job_desc):
+    return (hashlib.sha256(pdf_bytes).hexdigest(),
+            hashlib.sha256(job_desc.strip().encode("utf-8")).hexdigest())
+
+
+class Speculation:
+    def __init__(self, signature, extraction, analysis=None):
+        self.signature = signature
+        self.extraction = extraction
+        self.analysis = analysis
+        # Set when the user asks for the result, ends the debounce early
+        self.immediate = threading.Event()
+
+    @property
+    def status(self):
+        if self.analysis is None:
+            return "extracting" if not self.extraction.done() else "extracted"
+        return "ready" if self.analysis.done() else "analyzing"
+
+
+class SpeculativeRunner:
+    """Per-session speculative work, scheduled on a shared executor."""
+
+    def __init__(self, executor, extract_fn, analyze_fn, debounce_s=2.0, min_resume_chars=100):
+        self._executor = executor
+        self._extract_fn = extract_fn
+        self._analyze_fn = analyze_fn
+        self._debounce_s = debounce_s
+        self._min_resume_chars = min_resume_chars
+        self._lock = threading.Lock()
+        self._pdf_digest = None
+        self._extraction = None
+        self._current = None
+        self._changed_at = 0.0
+
+    def upload(self, pdf_bytes):
+        """Start extracting a newly uploaded PDF; repeated calls are free."""
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        with self._lock:
+            if digest != self._pdf_digest or self._extraction.cancelled():
+                if self._extraction is not None:
+                    self._extraction.cancel()
+                self._cancel_analysis_locked()
+                self._pdf_digest = digest
+                self._extraction = self._executor.submit(self._extract_fn, pdf_bytes)
+            return self._extraction
+
+    def speculate(self, pdf_bytes, job_desc, immediate=False):
+        """Schedule analysis for these inputs, replacing any stale speculation.
+
+        Calling again with unchanged inputs returns the same speculation, which
+        is how the analyze button attaches to in-flight or finished work. With
+        ``immediate`` the analysis starts without waiting for the debounce.
+        """
+        extraction = self.upload(pdf_bytes)
+        signature = input_signature(pdf_bytes, job_desc)
+        with self._lock:
+            if self._current is not None and self._current.signature == signature:
+                if immediate:
+                    self._current.immediate.set()
+                return self._current
+            self._cancel_analysis_locked()
+            self._changed_at = time.monotonic()
+            speculation = Speculation(signature, extraction)
+            if immediate:
+                speculation.immediate.set()
+            speculation.analysis = self._executor.submit(self._run, speculation, job_desc)
+            self._current = speculation
+            return speculation
+
+    def claim(self, speculation):
+        """Take back a speculative analysis that has not started running yet.
+
+        Returns True when the caller should run the analysis itself instead of
+        waiting for a worker, e.g. while other sessions keep the pool busy.
+        """
+        with self._lock:
+            if speculation.analysis is None or not speculation.analysis.cancel():
+                return False
+            if self._current is speculation:
+                self._current = None
+            return True
+
+    def discard_analysis(self):
+        """Drop the current speculative analysis, e.g. when inputs become invalid."""
+        with self._lock:
+            self._cancel_analysis_locked()
+
+    def cancel(self):
+        with self._lock:
+            self._cancel_analysis_locked()
+            if self._extraction is not None:
+                self._extraction.cancel()
+            self._pdf_digest = None
+            self._extraction = None
+
+    def _cancel_analysis_locked(self):
+        # A running request cannot be interrupted; dropping it from _current
+        # makes _run bail out at its next check and its result is never used.
+        if self._current is not None:
+            self._current.analysis.cancel()
+            self._current = None
+
+    def _is_current(self, speculation):
+        with self._lock:
+            return self._current is speculation
+
+    def _run(self, speculation, job_desc):
+        resume_text = speculation.extraction.result()
+        if not resume_text or len(resume_text.strip()) <= self._min_resume_chars:
+            return None
+
+        # Debounce: only spend an LLM call once the inputs have settled
+        while True:
+            if not self._is_current(speculation):
+                raise CancelledError()
+            remaining = self._debounce_s - (time.monotonic() - self._changed_at)
+            if remaining <= 0 or speculation.immediate.wait(min(remaining, 0.1)):
+                break
+
+        return self._analyze_fn(resume_text, job_desc)
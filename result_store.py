@@ -0,0 +1,300 @@
+import glob
+import hashlib
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from job_model import job_hash as compute_job_hash
+
+# Columnar store for analysis results.
+#
+# Every append writes one zstd-compressed Parquet file into the store
+# directory, so writers never rewrite existing data and concurrent appends
+# from the app and batch runs don't conflict. compact() merges the small part
+# files into one compacted file and then merges compacted files in tiers, so
+# the store stays at a few dozen files however many analyses it holds. It runs
+# in a background thread once enough parts pile up, and a lock file in the
+# store directory keeps compactions in different processes from merging the
+# same files twice. Queries scan only the columns they need and push filters
+# down to the Parquet row-group statistics, which keeps aggregates over
+# hundreds of thousands of analyses well under a second. No resume text is
+# stored, only hashes, scores, timings and skill lists.
+
+# Default location, overridden by RESULT_STORE_DIR (read per store so .env applies)
+DEFAULT_STORE_DIR = os.path.join("data", "analyses")
+
+# Merge part files automatically once there are this many
+AUTO_COMPACT_FILES = 256
+
+# COMPACT_FANOUT compacted files in the same size tier (rows within the same
+# power of COMPACT_FANOUT) are merged into one, until files reach
+# COMPACT_TARGET_ROWS. Each row is rewritten only a handful of times.
+COMPACT_FANOUT = 8
+COMPACT_TARGET_ROWS = 500_000
+
+# Held while compacting; a lock older than this was left by a crashed process
+COMPACT_LOCK = ".compact.lock"
+STALE_LOCK_S = 600
+
+SCHEMA = pa.schema([
+    ("analysis_id", pa.string()),
+    ("created_at", pa.timestamp("ms")),
+    ("source", pa.dictionary(pa.int8(), pa.string())),
+    ("model", pa.dictionary(pa.int16(), pa.string())),
+    ("job_hash", pa.string()),
+    ("job_title", pa.string()),
+    ("resume_sha256", pa.string()),
+    ("match_percentage", pa.int16()),
+    ("score_ci_low", pa.int16()),
+    ("score_ci_high", pa.int16()),
+    ("local_score", pa.int16()),
+    ("extraction_s", pa.float32()),
+    ("analysis_s", pa.float32()),
+    ("total_s", pa.float32()),
+    ("prompt_tokens", pa.int32()),
+    ("completion_tokens", pa.int32()),
+    ("total_tokens", pa.int32()),
+    ("matched_skills", pa.list_(pa.string())),
+    ("missing_skills", pa.list_(pa.string())),
+])
+
+
+def build_record(source, model, job_desc=None, job_model=None, resume_text=None, resume_sha256=None,
+                 match_percentage=None, confidence=None, local_check=None, timings=None, usage=None):
+    """One store row from the pieces an analysis produces; missing parts stay null."""
+    timings = timings or {}
+    usage = usage or {}
+    if resume_sha256 is None and resume_text:
+        resume_sha256 = hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+    missing = []
+    if local_check:
+        missing = local_check["missing_must_have"] + local_check["missing_nice_to_have"]
+    return {
+        "analysis_id": uuid.uuid4().hex,
+        "created_at": datetime.now(),
+        "source": source,
+        "model": model,
+        "job_hash": job_model["job_hash"] if job_model else (compute_job_hash(job_desc) if job_desc else None),
+        "job_title": job_model.get("title") if job_model else None,
+        "resume_sha256": resume_sha256,
+        "match_percentage": match_percentage,
+        "score_ci_low": confidence["ci_low"] if confidence else None,
+        "score_ci_high": confidence["ci_high"] if confidence else None,
+        "local_score": local_check["score"] if local_check else None,
+        "extraction_s": timings.get("extraction_s"),
+        "analysis_s": timings.get("analysis_s"),
+        "total_s": timings.get("total_s"),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+        "matched_skills": local_check["matched"] if local_check else [],
+        "missing_skills": missing,
+    }
+
+
+class ResultStore:
+    def __init__(self, path=None):
+        self.path = path or os.getenv("RESULT_STORE_DIR", DEFAULT_STORE_DIR)
+        self._row_counts = {}  # files are immutable, so row counts never change
+
+    def _files(self, pattern="*.parquet"):
+        return sorted(glob.glob(os.path.join(self.path, pattern)))
+
+    def _write(self, table, prefix="part"):
+        os.makedirs(self.path, exist_ok=True)
+        name = f"{prefix}-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = os.path.join(self.path, f".{name}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, os.path.join(self.path, name))  # readers never see partial files
+
+    def append(self, records):
+        """Append result rows (dicts keyed by SCHEMA column names)."""
+        if not records:
+            return
+        columns = {field.name: [record.get(field.name) for record in records] for field in SCHEMA}
+        self._write(pa.Table.from_pydict(columns, schema=SCHEMA))
+        if len(self._files("part-*.parquet")) >= AUTO_COMPACT_FILES:
+            # Not a daemon, so a process that is exiting finishes the merge first
+            threading.Thread(target=self.compact, name="result-store-compact").start()
+
+    def compact(self, full=False):
+        """Merge small files into larger ones, sorted by time.
+
+        Part files are merged into one compacted file, then compacted files
+        below COMPACT_TARGET_ROWS are merged tier by tier. With ``full`` every
+        file below the target is merged right away instead. Returns the number
+        of files merged, 0 when there was nothing to merge or another process
+        is already compacting.
+        """
+        if not self._acquire_lock():
+            return 0
+        try:
+            merged = 0
+            parts = self._files("part-*.parquet")
+            if len(parts) >= 2 or (parts and full):
+                merged += self._merge(parts)
+            while True:
+                group = self._next_group(full)
+                if not group:
+                    return merged
+                merged += self._merge(group)
+        finally:
+            os.remove(os.path.join(self.path, COMPACT_LOCK))
+
+    def _rows(self, file):
+        if file not in self._row_counts:
+            self._row_counts[file] = pq.ParquetFile(file).metadata.num_rows
+        return self._row_counts[file]
+
+    def _next_group(self, full):
+        small = sorted((self._rows(file), file) for file in self._files("compacted-*.parquet")
+                       if self._rows(file) < COMPACT_TARGET_ROWS)
+        if full:
+            # Smallest first, until the merged file would reach the target
+            group, rows = [], 0
+            for count, file in small:
+                if rows >= COMPACT_TARGET_ROWS:
+                    break
+                group.append(file)
+                rows += count
+            return group if len(group) >= 2 else None
+        tiers = {}
+        for count, file in small:
+            tiers.setdefault(int(math.log(max(count, 1), COMPACT_FANOUT)), []).append(file)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= COMPACT_FANOUT:
+                return tiers[tier][:COMPACT_FANOUT]
+        return None
+
+    def _merge(self, files):
+        table = ds.dataset(files, schema=SCHEMA, format="parquet").to_table()
+        self._write(table.sort_by("created_at"), prefix="compacted")
+        for file in files:
+            self._row_counts.pop(file, None)
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+        return len(files)
+
+    def _acquire_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        lock = os.path.join(self.path, COMPACT_LOCK)
+        try:
+            if time.time() - os.path.getmtime(lock) > STALE_LOCK_S:
+                os.remove(lock)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def _dataset(self):
+        return ds.dataset(self._files(), schema=SCHEMA, format="parquet")
+
+    @staticmethod
+    def _filter(job_hash=None, since=None, until=None, model=None, source=None):
+        expr = None
+        for part in (
+            ds.field("job_hash") == job_hash if job_hash else None,
+            ds.field("created_at") >= pa.scalar(since, pa.timestamp("ms")) if since else None,
+            ds.field("created_at") < pa.scalar(until, pa.timestamp("ms")) if until else None,
+            ds.field("model") == model if model else None,
+            ds.field("source") == source if source else None,
+        ):
+            if part is not None:
+                expr = part if expr is None else expr & part
+        return expr
+
+    def query(self, columns=None, **filters):
+        """Filtered table of results, reading only ``columns``.
+
+        Filters: ``job_hash``, ``since``/``until`` (datetimes), ``model``, ``source``.
+        """
+        if not self._files():
+            return SCHEMA.empty_table().select(columns) if columns else SCHEMA.empty_table()
+        try:
+            return self._dataset().to_table(columns=columns, filter=self._filter(**filters))
+        except FileNotFoundError:
+            # A concurrent compact() removed files we listed, rescan once
+            return self._dataset().to_table(columns=columns, filter=self._filter(**filters))
+
+    def count(self, **filters):
+        return self.query(columns=["analysis_id"], **filters).num_rows
+
+    def jobs(self, **filters):
+        """Known postings as ``[(job_hash, job_title, analyses)]``, most analysed first."""
+        table = self.query(columns=["job_hash", "job_title"], **filters)
+        if table.num_rows == 0:
+            return []
+        grouped = table.group_by("job_hash").aggregate([("job_title", "max"), ("job_hash", "count")])
+        rows = zip(grouped["job_hash"].to_pylist(), grouped["job_title_max"].to_pylist(),
+                   grouped["job_hash_count"].to_pylist())
+        return sorted(rows, key=lambda row: -row[2])
+
+    def score_distribution(self, bins=10, **filters):
+        """Histogram and summary statistics of match percentages."""
+        scores = self.query(columns=["match_percentage"], **filters)["match_percentage"]
+        scores = pc.drop_null(scores)
+        width = 100 / bins
+        histogram = [0] * bins
+        if len(scores):
+            bucket = pc.cast(pc.min_element_wise(pc.floor(pc.divide(pc.cast(scores, pa.float64()), width)),
+                                                 bins - 1), pa.int64())
+            counts = pc.value_counts(bucket)
+            for value, count in zip(counts.field("values").to_pylist(), counts.field("counts").to_pylist()):
+                histogram[value] = count
+        quantiles = pc.quantile(scores, q=[0.25, 0.5, 0.75]).to_pylist() if len(scores) else [None] * 3
+        return {
+            "count": len(scores),
+            "mean": pc.mean(scores).as_py(),
+            "p25": quantiles[0],
+            "median": quantiles[1],
+            "p75": quantiles[2],
+            "bins": [(round(i * width), round((i + 1) * width)) for i in range(bins)],
+            "histogram": histogram,
+        }
+
+    def top_missing_skills(self, limit=20, **filters):
+        """Most frequent missing skills as ``[(skill, count)]``."""
+        return self._top_list_values("missing_skills", limit, **filters)
+
+    def top_matched_skills(self, limit=20, **filters):
+        return self._top_list_values("matched_skills", limit, **filters)
+
+    def _top_list_values(self, column, limit, **filters):
+        values = pc.list_flatten(self.query(columns=[column], **filters)[column])
+        if len(values) == 0:
+            return []
+        counts = pc.value_counts(pc.utf8_lower(values))
+        order = pc.array_sort_indices(counts.field("counts"), order="descending")
+        top = pc.take(counts, order[:limit])
+        return list(zip(top.field("values").to_pylist(), top.field("counts").to_pylist()))
+
+    def summary(self, **filters):
+        """Averages of scores, timings and token usage, overall and per model."""
+        table = self.query(columns=["model", "match_percentage", "extraction_s", "analysis_s",
+                                    "total_s", "total_tokens"], **filters)
+        overall = {"analyses": table.num_rows}
+        for column in ("match_percentage", "extraction_s", "analysis_s", "total_s", "total_tokens"):
+            overall[f"avg_{column}"] = pc.mean(table[column]).as_py() if table.num_rows else None
+        overall["sum_total_tokens"] = pc.sum(table["total_tokens"]).as_py() if table.num_rows else 0
+
+        per_model = []
+        if table.num_rows:
+            table = table.set_column(0, "model", pc.cast(table["model"], pa.string()))
+            grouped = table.group_by("model").aggregate([
+                ("model", "count"), ("match_percentage", "mean"), ("analysis_s", "mean"), ("total_tokens", "mean"),
+            ])
+            per_model = grouped.to_pylist()
+        return {"overall": overall, "per_model": per_model}
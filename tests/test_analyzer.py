@@ -0,0 +1,99 @@
+import threading
+import time
+
+from analyzer import consistent_match_score, extract_match_percentage, job_prompt_section, request_analysis_with_usage
+from job_model import compile_heuristic
+from llm_backends import LLMBackend, StubBackend
+
+RESUME = "Python developer with Django, PostgreSQL and Docker experience. " * 3
+JOB = "Backend engineer: Python, Django, PostgreSQL, Docker and AWS. Build REST APIs for our platform. " * 2
+
+
+class ScriptedBackend(LLMBackend):
+    """Answers score requests with a fixed sequence and tracks concurrency."""
+
+    name = "scripted"
+
+    def __init__(self, scores, delay=0.0):
+        super().__init__("test")
+        self._scores = iter(scores)
+        self._delay = delay
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    def _complete(self, messages, max_tokens, temperature):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            score = next(self._scores)
+        time.sleep(self._delay)
+        with self._lock:
+            self.in_flight -= 1
+        return f"{score}%", 10, 1
+
+
+def test_agreeing_samples_stop_after_min_samples():
+    backend = ScriptedBackend([70, 72, 71, 99, 99])
+    result = consistent_match_score(backend, RESUME, JOB, samples=5, min_samples=3, tolerance=5)
+    assert backend.calls == 3
+    assert result["score"] == 71
+    assert result["stopped_early"]
+    assert result["ci_low"] <= 71 <= result["ci_high"]
+
+
+def test_disagreeing_samples_stop_once_interval_is_narrow():
+    backend = ScriptedBackend([66, 70, 74] + [70] * 7)
+    result = consistent_match_score(backend, RESUME, JOB, samples=10, min_samples=3, tolerance=5)
+    assert backend.calls == 4
+    assert result["score"] == 70
+    assert result["stopped_early"]
+
+
+def test_wide_disagreement_uses_remaining_samples_in_one_wave():
+    backend = ScriptedBackend([60, 70, 80, 70, 70], delay=0.05)
+    result = consistent_match_score(backend, RESUME, JOB, samples=5, min_samples=3, tolerance=5)
+    assert backend.calls == 5
+    assert sorted(result["samples"]) == [60, 70, 70, 70, 80]
+    assert not result["stopped_early"]
+    assert backend.peak >= 2  # the last two samples ran together, not one by one
+
+
+def test_failed_samples_do_not_count():
+    backend = ScriptedBackend(["n/a", 70, 70, 70])
+    result = consistent_match_score(backend, RESUME, JOB, samples=5, min_samples=3, tolerance=5)
+    assert result["samples"] == [70, 70, 70]
+
+
+def test_limiter_caps_concurrent_requests():
+    backend = ScriptedBackend([70] * 5, delay=0.05)
+    consistent_match_score(backend, RESUME, JOB, samples=5, min_samples=3, limiter=threading.BoundedSemaphore(1))
+    assert backend.peak == 1
+
+
+def test_narrative_prompt_always_has_the_raw_posting():
+    captured = []
+
+    class Capture(StubBackend):
+        def _complete(self, messages, max_tokens, temperature):
+            captured.append(messages[-1]["content"])
+            return super()._complete(messages, max_tokens, temperature)
+
+    text, usage = request_analysis_with_usage(Capture(), RESUME, JOB)
+    assert JOB in captured[0]
+    assert extract_match_percentage(text) is not None
+    assert usage["total_tokens"] > 0
+
+
+def test_heuristic_models_never_replace_the_raw_posting():
+    model = compile_heuristic(JOB)
+    assert job_prompt_section(JOB, model) == f"**JOB DESCRIPTION:**\n{JOB}"
+    compiled = dict(model, compiled_by="openrouter:model")
+    assert "compiled from the job description" in job_prompt_section(JOB, compiled)
+
+
+def test_extract_match_percentage():
+    assert extract_match_percentage("1. **MATCH PERCENTAGE**: 82%") == 82
+    assert extract_match_percentage("no score here") is None
@@ -0,0 +1,71 @@
+import json
+
+import pymupdf
+import pytest
+
+import batch
+from result_store import ResultStore
+
+JOB = ("Backend Engineer\nRequirements:\n- 3+ years of Python and Django\n- SQL, Docker and AWS\n"
+       "Nice to have:\n- Kubernetes\nYou will build APIs and services for our platform team.")
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    resumes = tmp_path / "resumes"
+    resumes.mkdir()
+    for i, skills in enumerate(["Python, Django, SQL", "Java, Spring, Oracle", "Python, Docker, AWS"]):
+        doc = pymupdf.open()
+        doc.new_page().insert_textbox(pymupdf.Rect(50, 50, 550, 800), (
+            f"Candidate {i}\nSoftware engineer with {i + 2} years of experience.\nSkills: {skills}\n"
+            + "Delivered projects end to end with the team. " * 5))
+        doc.save(resumes / f"r{i}.pdf")
+    job = tmp_path / "backend.txt"
+    job.write_text(JOB, encoding="utf-8")
+    return tmp_path
+
+
+def run_batch(workspace, *extra, store=False):
+    output = workspace / "results.jsonl"
+    store = ["--store", str(workspace / "analyses")] if store else ["--no-store"]
+    code = batch.main([str(workspace / "resumes"), "-j", str(workspace / "backend.txt"), "-o", str(output),
+                       "--backend", "stub", "--workers", "1", *store, *extra])
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    return code, records
+
+
+def test_resume_only_processes_missing_pairs(workspace):
+    code, records = run_batch(workspace)
+    assert code == 0
+    assert len(records) == 3
+    assert all(0 <= r["match_percentage"] <= 100 for r in records)
+
+    # Drop one pair from the checkpoint as if the run had died before finishing it
+    checkpoint = workspace / "results.jsonl.checkpoint"
+    keys = checkpoint.read_text(encoding="utf-8").splitlines()
+    checkpoint.write_text("\n".join(keys[1:]) + "\n", encoding="utf-8")
+
+    code, records = run_batch(workspace)
+    assert code == 0
+    assert len(records) == 4
+    assert records[-1]["resume_sha256"] == keys[0].split(":")[0]
+
+    code, records = run_batch(workspace)
+    assert len(records) == 4
+
+
+def test_score_samples_add_confidence(workspace):
+    code, records = run_batch(workspace, "--score-samples", "3")
+    assert code == 0
+    for record in records:
+        assert record["match_confidence"]["samples"]
+        assert record["match_percentage"] == record["match_confidence"]["score"]
+
+
+def test_every_checkpointed_pair_is_stored(workspace):
+    code, records = run_batch(workspace, store=True)
+    assert code == 0
+    checkpointed = (workspace / "results.jsonl.checkpoint").read_text(encoding="utf-8").split()
+    store = ResultStore(str(workspace / "analyses"))
+    assert store.count() == len(checkpointed) == len(records) == 3
+    assert store.count(source="batch") == 3
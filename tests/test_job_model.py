@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+import job_model
+from llm_backends import LLMBackend, StubBackend
+
+JOB = """Backend Engineer
+Requirements:
+- 3+ years of Python and Django
+- SQL, Docker and AWS
+- Bachelor's degree in Computer Science
+Nice to have:
+- Kubernetes
+"""
+
+COMPILED = {
+    "title": "ICU Registered Nurse",
+    "must_have": ["RN license", "CCRN", "Epic EHR"],
+    "nice_to_have": ["ACLS"],
+    "min_years_experience": 2,
+    "education": None,
+    "responsibilities": ["critical patient care"],
+    "keywords": {"ICU": 1.0, "Epic EHR": 0.8},
+}
+
+
+class JsonBackend(LLMBackend):
+    """Returns a fixed compile reply, or fails while ``failing`` is set."""
+
+    name = "json"
+
+    def __init__(self):
+        super().__init__("test")
+        self.failing = False
+        self.calls = 0
+
+    def _complete(self, messages, max_tokens, temperature):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError("429 Too Many Requests")
+        return "```json\n" + json.dumps(COMPILED) + "\n```", 100, 50
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(job_model, "_cache", {})
+    monkeypatch.setattr(job_model, "_fallback_expiry", {})
+    monkeypatch.setenv("JOB_MODEL_CACHE_DIR", str(tmp_path / "job_models"))
+
+
+def test_heuristic_splits_required_and_preferred_skills():
+    model = job_model.compile_heuristic(JOB)
+    assert model["compiled_by"] == "heuristic"
+    assert {"python", "sql", "docker"} <= set(model["must_have"])
+    assert model["nice_to_have"] == ["kubernetes"]
+    assert model["min_years_experience"] == 3
+    assert model["education"].lower().startswith("bachelor")
+    assert model["title"] == "Backend Engineer"
+
+
+def test_local_score_reports_matches_and_gaps():
+    model = job_model.compile_heuristic(JOB)
+    strong = job_model.local_score("Python, Django, SQL, Docker, AWS and Kubernetes engineer", model)
+    weak = job_model.local_score("Java and Spring developer", model)
+    assert strong["score"] > weak["score"]
+    assert "kubernetes" in strong["matched"]
+    assert "python" in weak["missing_must_have"]
+
+
+def test_llm_compile_is_cached_in_memory_and_on_disk(tmp_path):
+    backend = JsonBackend()
+    model = job_model.compile_job_description(JOB, backend)
+    assert model["compiled_by"] == "json:test"
+    assert model["must_have"] == ["RN license", "CCRN", "Epic EHR"]
+    assert job_model.compile_job_description(JOB, backend) is model
+    assert (tmp_path / "job_models" / f"{model['job_hash']}.json").exists()
+
+    job_model._cache.clear()
+    assert job_model.compile_job_description(JOB, backend)["must_have"] == model["must_have"]
+    assert backend.calls == 1
+
+
+def test_fallback_after_llm_failure_is_retried_later(monkeypatch):
+    backend = JsonBackend()
+    backend.failing = True
+    assert job_model.compile_job_description(JOB, backend)["compiled_by"] == "heuristic"
+    backend.failing = False
+    # Still within the retry window
+    assert job_model.compile_job_description(JOB, backend)["compiled_by"] == "heuristic"
+    assert backend.calls == 1
+
+    monkeypatch.setattr(job_model, "FALLBACK_RETRY_S", 0)
+    job_model._fallback_expiry.clear()
+    backend.failing = True
+    job_model._cache.clear()
+    job_model.compile_job_description(JOB, backend)
+    backend.failing = False
+    assert job_model.compile_job_description(JOB, backend)["compiled_by"] == "json:test"
+
+
+def test_stub_compiles_are_not_persisted(tmp_path):
+    model = job_model.compile_job_description(JOB, StubBackend())
+    assert model["compiled_by"] == "stub:deterministic"
+    assert not (tmp_path / "job_models").exists()
+
+
+def test_render_job_model():
+    text = job_model.render_job_model(job_model._normalize(COMPILED, "key", "json:test"))
+    assert "Must-have: RN license, CCRN, Epic EHR" in text
+    assert "Minimum experience: 2 years" in text
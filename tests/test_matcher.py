@@ -0,0 +1,69 @@
+import numpy as np
+
+import matcher
+
+RESUMES = [
+    "Backend developer: Python, Django, PostgreSQL, Docker and REST API design.",
+    "Registered nurse with ICU experience, Epic charting and patient care.",
+    "Frontend engineer building React and TypeScript single page apps.",
+]
+JOBS = [
+    "Backend engineer: Python, Django, PostgreSQL, Docker. REST API experience required.",
+    "ICU nurse: critical patient care, Epic charting.",
+]
+
+
+def encode():
+    vocab = matcher.Vocabulary().fit(RESUMES + JOBS)
+    return vocab, vocab.encode(RESUMES), vocab.encode(JOBS)
+
+
+def test_tokenize_adds_skill_phrases():
+    terms = matcher.tokenize("Machine learning with Python and C++")
+    assert "skill:machine learning" in terms
+    assert "skill:python" in terms
+    assert "skill:c++" in terms
+    assert "with" not in terms
+
+
+def test_score_matrix_ranks_matching_pairs_highest():
+    _, resumes, jobs = encode()
+    scores = matcher.score_matrix(resumes, jobs)
+    assert scores.shape == (3, 2)
+    assert ((scores >= 0) & (scores <= 100.001)).all()
+    assert scores[:, 0].argmax() == 0
+    assert scores[:, 1].argmax() == 1
+
+
+def test_chunking_does_not_change_scores():
+    _, resumes, jobs = encode()
+    np.testing.assert_allclose(matcher.score_matrix(resumes, jobs, chunk_size=1),
+                               matcher.score_matrix(resumes, jobs))
+
+
+def test_top_k_matches_full_matrix():
+    _, resumes, jobs = encode()
+    scores = matcher.score_matrix(resumes, jobs)
+    indices, top = matcher.top_k_resumes(resumes, jobs, k=2, chunk_size=1)
+    for job in range(2):
+        expected = np.argsort(-scores[:, job], kind="stable")[:2]
+        assert list(indices[job]) == list(expected)
+        np.testing.assert_allclose(top[job], scores[expected, job])
+
+
+def test_top_pairs_skips_pairs_without_overlap():
+    _, resumes, jobs = encode()
+    pairs = matcher.top_pairs(resumes, jobs, k_per_job=3)
+    assert pairs
+    assert all(score > 0 for _, _, score in pairs)
+    assert (2, 1) not in {(resume, job) for resume, job, _ in pairs}
+    assert pairs == sorted(pairs, key=lambda pair: -pair[2])
+
+
+def test_vocabulary_save_load_round_trip(tmp_path):
+    vocab, resumes, _ = encode()
+    path = tmp_path / "vocabulary.json"
+    vocab.save(path)
+    loaded = matcher.Vocabulary.load(path)
+    assert len(loaded) == len(vocab)
+    assert (loaded.encode(RESUMES) != resumes).nnz == 0
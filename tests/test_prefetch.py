@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+
+from prefetch import SpeculativeRunner
+
+RESUME = "Python developer " * 20
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=2)
+    yield pool
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+def make_runner(executor, debounce_s=0.2, calls=None):
+    calls = [] if calls is None else calls
+
+    def analyze(resume_text, job_desc):
+        calls.append(job_desc)
+        return f"analysis for {job_desc}", {}
+
+    return SpeculativeRunner(executor, lambda pdf: RESUME, analyze, debounce_s=debounce_s), calls
+
+
+def test_unchanged_inputs_reuse_the_speculation(executor):
+    runner, calls = make_runner(executor)
+    first = runner.speculate(b"pdf", "job")
+    assert runner.speculate(b"pdf", "job") is first
+    assert first.analysis.result(timeout=5) == ("analysis for job", {})
+    assert calls == ["job"]
+    assert first.status == "ready"
+
+
+def test_changed_inputs_cancel_the_stale_speculation(executor):
+    runner, calls = make_runner(executor)
+    stale = runner.speculate(b"pdf", "job v1")
+    fresh = runner.speculate(b"pdf", "job v2")
+    assert fresh is not stale
+    with pytest.raises(CancelledError):
+        stale.analysis.result(timeout=5)
+    assert fresh.analysis.result(timeout=5)[0] == "analysis for job v2"
+    assert calls == ["job v2"]
+
+
+def test_immediate_skips_the_debounce(executor):
+    runner, _ = make_runner(executor, debounce_s=5)
+    started = time.monotonic()
+    runner.speculate(b"pdf", "job")
+    speculation = runner.speculate(b"pdf", "job", immediate=True)
+    speculation.analysis.result(timeout=5)
+    assert time.monotonic() - started < 1
+
+
+def test_short_resume_is_not_analysed(executor):
+    calls = []
+    runner = SpeculativeRunner(executor, lambda pdf: "too short", lambda r, j: calls.append(j), debounce_s=0)
+    assert runner.speculate(b"pdf", "job").analysis.result(timeout=5) is None
+    assert calls == []
+
+
+def test_claim_takes_back_queued_work():
+    pool = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    pool.submit(release.wait)  # keep the only worker busy
+    try:
+        runner, calls = make_runner(pool, debounce_s=0)
+        speculation = runner.speculate(b"pdf", "job")
+        assert runner.claim(speculation)
+        assert speculation.analysis.cancelled()
+        # A new speculation for the same inputs is scheduled afresh
+        assert runner.speculate(b"pdf", "job") is not speculation
+        assert calls == []
+    finally:
+        release.set()
+        pool.shutdown(wait=True, cancel_futures=True)
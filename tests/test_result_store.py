@@ -0,0 +1,100 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import result_store
+from result_store import ResultStore, build_record
+
+JOB = "Backend engineer: Python, Django, PostgreSQL, Docker and AWS. " * 3
+
+
+def record(score, source="app", model="stub:deterministic", missing=("docker",)):
+    local_check = {"score": score, "matched": ["python"], "missing_must_have": list(missing),
+                   "missing_nice_to_have": []}
+    return build_record(source, model, job_desc=JOB, resume_text=f"resume {score}", match_percentage=score,
+                        local_check=local_check, timings={"analysis_s": 2.0}, usage={"total_tokens": 100})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path / "analyses"))
+
+
+def test_path_is_read_when_the_store_is_created(monkeypatch, tmp_path):
+    monkeypatch.setenv("RESULT_STORE_DIR", str(tmp_path / "from-env"))
+    assert ResultStore().path == str(tmp_path / "from-env")
+    assert ResultStore("explicit").path == "explicit"
+
+
+def test_empty_store_queries(store):
+    assert store.count() == 0
+    assert store.jobs() == []
+    assert store.score_distribution()["count"] == 0
+    assert store.summary()["overall"]["analyses"] == 0
+
+
+def test_append_and_aggregate(store):
+    store.append([record(score) for score in (40, 60, 80)])
+    store.append([record(95, source="batch", missing=("aws", "docker"))])
+    assert store.count() == 4
+    assert store.count(source="batch") == 1
+    assert store.count(since=datetime.now() + timedelta(hours=1)) == 0
+
+    distribution = store.score_distribution()
+    assert distribution["count"] == 4
+    assert distribution["histogram"][4] == 1 and distribution["histogram"][9] == 1
+    assert store.top_missing_skills()[0] == ("docker", 4)
+    assert store.top_matched_skills() == [("python", 4)]
+    [(job, _, analyses)] = store.jobs()
+    assert analyses == 4
+    assert store.summary()["per_model"][0]["model_count"] == 4
+
+
+def test_compact_merges_parts_without_losing_rows(store):
+    for score in range(10):
+        store.append([record(score)])
+    assert store.compact() == 10
+    assert len(store._files()) == 1
+    assert store.count() == 10
+    assert store.compact() == 0
+
+
+def test_compact_skips_when_another_process_holds_the_lock(store):
+    store.append([record(1)])
+    store.append([record(2)])
+    open(f"{store.path}/{result_store.COMPACT_LOCK}", "w").close()
+    assert store.compact() == 0
+    assert len(store._files()) == 2
+
+
+def test_compacted_files_are_merged_in_tiers(store, monkeypatch):
+    monkeypatch.setattr(result_store, "COMPACT_FANOUT", 4)
+    for batch in range(4):
+        store.append([record(score) for score in range(10 * batch, 10 * batch + 4)])
+        store.append([record(10 * batch + 4)])
+        store.compact()  # 5 rows per compacted file, all in the same tier
+    assert len(store._files()) == 1
+    assert store.count() == 20
+
+
+def test_full_compaction_merges_small_compacted_files(store):
+    for batch in range(3):
+        store.append([record(batch)])
+        store.append([record(batch + 10)])
+        store.compact()
+    assert len(store._files()) == 3
+    assert store.compact(full=True) == 3
+    assert len(store._files()) == 1
+    assert store.count() == 6
+
+
+def test_automatic_compaction_runs_in_the_background(store, monkeypatch):
+    monkeypatch.setattr(result_store, "AUTO_COMPACT_FILES", 3)
+    for score in range(3):
+        store.append([record(score)])
+    for thread in threading.enumerate():
+        if thread.name == "result-store-compact":
+            thread.join(timeout=10)
+    assert len(store._files()) == 1
+    assert store.count() == 3